@@ -1,28 +1,199 @@
 import streamlit as st
 import gdown
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
 import numpy as np
-from PIL import Image
+from PIL import ExifTags, Image, ImageOps
 import os
+import tempfile
+import threading
+import time
+
+import sibetta_metrics as metrics
+from sibetta_cache import PredictionCache, hash_bytes, hash_file
+from sibetta_index import EmbeddingIndex, build_joint_model, open_index
+from sibetta_stream import StreamClassifier, iter_video_frames
 
 
 # URL Google Drive untuk model .h5
 url = "https://drive.google.com/uc?id=1hw_C0TIXi-t_-7MV70_p7Ta8SPNlKNT3"
 output = "best_model_16.h5"
 
-# Unduh model jika belum ada di direktori lokal
-if not os.path.exists(output):
-    st.write("Downloading model...")
-    gdown.download(url, output, quiet=False)
+# File model untuk tiap backend inferensi (file TFLite dibuat dengan sibetta_tflite.py,
+# student hasil distilasi dengan sibetta_distill.py)
+model_files = {
+    'keras': output,
+    'tflite-fp16': "best_model_16_fp16.tflite",
+    'tflite-int8': "best_model_16_int8.tflite",
+    'student': "best_model_student.h5",
+}
+backend = os.environ.get('SIBETTA_BACKEND', 'keras')
+
+# Checksum sha256 model (`sha256sum best_model_16.h5` dari unduhan resmi), wajib diisi saat deploy.
+# Tanpa checksum, hanya keutuhan file .h5 yang bisa dicek (lihat verify_model_file).
+model_sha256 = os.environ.get('SIBETTA_MODEL_SHA256')
+
+# Folder indeks embedding gambar referensi (dibuat dengan sibetta_index.py build), kosongkan untuk menonaktifkan
+index_dir = os.environ.get('SIBETTA_INDEX_DIR', 'index')
+duplicate_threshold = float(os.environ.get('SIBETTA_DUPLICATE_THRESHOLD', 0.95))
+# Deteksi unggahan yang hampir sama bersifat opsional: jumlah maksimum unggahan yang diingat (0 = nonaktif)
+upload_index_size = int(os.environ.get('SIBETTA_UPLOAD_INDEX_SIZE', 0))
+
+# Waktu modul dimuat, sebagai titik awal pengukuran time-to-ready
+started_at = time.perf_counter()
+
+# Unduh model jika belum ada di direktori lokal. File diunduh ke nama sementara
+# lalu di-rename, sehingga unduhan yang terputus tidak meninggalkan file setengah jadi.
+def download_model():
+    if not os.path.exists(output):
+        print("Downloading model...")
+        tmp_output = output + '.download'
+        gdown.download(url, tmp_output, quiet=False)
+        os.replace(tmp_output, output)
+
+# Verifikasi file model; mengembalikan hash sha256 file tersebut. Jika checksum tidak diketahui,
+# file .h5 tetap dicek utuh: HDF5 menyimpan ukuran file di superblock sehingga file terpotong ditolak.
+def verify_model_file(path, expected=None):
+    digest = hash_file(path)
+    if expected is not None and digest != expected:
+        raise ValueError(f'{path} rusak atau tidak sesuai: sha256 {digest}, seharusnya {expected}')
+    if expected is None and path.endswith('.h5'):
+        import h5py
+
+        print(f'PERINGATAN: SIBETTA_MODEL_SHA256 tidak diisi, {path} hanya dicek keutuhannya')
+
+        try:
+            h5py.File(path, 'r').close()
+        except OSError as e:
+            raise ValueError(f'{path} rusak: {e}')
+    return digest
+
+# TensorFlow hanya diimpor untuk backend Keras agar worker TFLite tetap ringan.
+# num_threads hanya berlaku untuk TFLite; thread TensorFlow diatur per proses (lihat sibetta_pool.py)
+def _load_model(backend, num_threads=None):
+    if backend in ('keras', 'student'):
+        from tensorflow.keras.models import load_model
+        return load_model(model_files[backend])
+    from sibetta_tflite import TFLiteModel
+    return TFLiteModel(model_files[backend], num_threads)
+
+
+# Memuat model di thread latar belakang: unduh (jika perlu), verifikasi checksum,
+# load, lalu warmup dengan satu batch dummy agar request pertama tidak lambat
+class ModelLoader:
+    def __init__(self, backend, num_threads=None):
+        self.backend = backend
+        self.num_threads = num_threads
+        self.model = None
+        self.model_hash = None
+        self.error = None
+        self.timings = {}
+        self.time_to_ready = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='sibetta-model-loader', daemon=True)
+        self.thread.start()
+
+    def _step(self, name, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.timings[name] = time.perf_counter() - start
+        metrics.model_load_seconds.set(self.timings[name], step=name)
+        return result
+
+    def _run(self):
+        try:
+            path = model_files[self.backend]
+            if self.backend == 'keras':
+                self._step('download', download_model)
+                try:
+                    self.model_hash = self._step('verify', verify_model_file, path, model_sha256)
+                except ValueError as e:
+                    # File model rusak: hapus lalu unduh ulang sekali
+                    print(e)
+                    if os.path.exists(path):
+                        os.remove(path)
+                    self._step('download', download_model)
+                    self.model_hash = self._step('verify', verify_model_file, path, model_sha256)
+            else:
+                self.model_hash = self._step('verify', verify_model_file, path)
+            model = self._step('load', _load_model, self.backend, self.num_threads)
+            self._step('warmup', model.predict_on_batch, np.zeros((1, 224, 224, 3), dtype=np.float32))
+            self.model = model
+            self.time_to_ready = time.perf_counter() - started_at
+            metrics.model_time_to_ready.set(self.time_to_ready)
+            print(f'Model {self.backend} siap dalam {self.time_to_ready:.1f} detik '
+                  + ' '.join(f'({name} {seconds:.1f}s)' for name, seconds in self.timings.items()))
+        except Exception as e:
+            self.error = e
+            metrics.errors.inc(stage='load', type=type(e).__name__)
+        finally:
+            self.ready.set()
+
+    def wait(self, timeout=None):
+        if not self.ready.wait(timeout):
+            return None
+        if self.error is not None:
+            raise self.error
+        return self.model
+
+# Loader dibuat sekali per proses dan langsung mulai memuat model
+@st.cache_resource
+def _start_model_loader(backend, num_threads):
+    return ModelLoader(backend, num_threads)
+
+# Loader yang gagal (misalnya unduhan terputus) tidak disimpan selamanya: pemanggilan berikutnya
+# membuang loader tersebut dari cache dan memulai pemuatan ulang
+def get_model_loader(backend=backend, num_threads=None):
+    loader = _start_model_loader(backend, num_threads)
+    if loader.error is not None:
+        _start_model_loader.clear(backend, num_threads)
+        loader = _start_model_loader(backend, num_threads)
+    return loader
+
+# Load model hanya sekali (menunggu sampai loader selesai)
+def load_model_once(backend=backend, num_threads=None):
+    return get_model_loader(backend, num_threads).wait()
+
+# Cache prediksi, dibagikan ke semua sesi dan dikunci ke hash file model
+@st.cache_resource
+def get_prediction_cache(model_hash):
+    return PredictionCache(
+        model_hash,
+        max_entries=int(os.environ.get('SIBETTA_CACHE_SIZE', 1024)),
+        cache_dir=os.environ.get('SIBETTA_CACHE_DIR'),
+    )
+
+# Indeks gambar referensi dari train/; None jika belum dibuat atau dibuat dengan model lain
+@st.cache_resource
+def get_reference_index(model_hash):
+    index = open_index(index_dir, model_hash)
+    if index is not None:
+        index.prepare()
+    return index
 
-# Load model hanya sekali
+# Indeks embedding unggahan sebelumnya, untuk mendeteksi unggahan yang hampir sama; None jika nonaktif
+@st.cache_resource
+def get_upload_index(model_hash):
+    if not upload_index_size:
+        return None
+    index = EmbeddingIndex(os.path.join(index_dir, 'uploads', model_hash[:16]), model_hash=model_hash)
+    index.trim(upload_index_size)
+    index.prepare()
+    return index
+
+# Model gabungan (softmax + embedding) untuk gambar referensi; embedding diambil dari base VGG16,
+# jadi hanya tersedia untuk backend Keras
 @st.cache_resource
-def load_model_once():
-    model = load_model(output)
-    return model
+def get_joint_model(_model):
+    return build_joint_model(_model)
 
-model = load_model_once()
+def similarity_enabled():
+    return bool(index_dir) and backend == 'keras'
+
+# Endpoint /metrics format Prometheus, aktif jika SIBETTA_METRICS_PORT diisi
+@st.cache_resource
+def start_metrics_exporter():
+    port = os.environ.get('SIBETTA_METRICS_PORT')
+    if port:
+        return metrics.start_http_server(int(port))
 
 # Define class indices (for prediction)
 class_indices = {
@@ -38,83 +209,191 @@ class_indices = {
     'veil_tail': 9
 }
 
+# Decode gambar langsung ke ukuran kecil: JPEG memakai draft mode (downscale saat decode DCT),
+# format lain memakai reduce() sebelum resize. Orientasi EXIF dan mode warna (RGBA, P, L, CMYK)
+# dinormalisasi ke RGB. Hasilnya array uint8 (tinggi, lebar, 3).
+# draft dan exif_transpose(in_place=True) mengubah objek gambar, jadi hanya dipakai pada gambar yang dibuka
+# di sini (path atau file); objek Image dari pemanggil tidak diubah dan di-decode pada ukuran penuh.
+def decode_image(source, target_size=(224, 224), resample=Image.BICUBIC):
+    owned = not isinstance(source, Image.Image)
+    img = Image.open(source) if owned else source
+    # draft hanya dipakai jika JPEG bisa diperkecil minimal 2x; pada skala 1 hasil decode-nya sedikit berbeda
+    if owned and img.format == 'JPEG' and img.width >= 2 * target_size[0] and img.height >= 2 * target_size[1]:
+        img.draft('RGB', target_size)
+    if owned:
+        ImageOps.exif_transpose(img, in_place=True)
+    elif img.getexif().get(ExifTags.Base.Orientation, 1) != 1:
+        img = ImageOps.exif_transpose(img)
+    has_alpha = img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+    if img.mode != ('RGBA' if has_alpha else 'RGB'):
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+    if has_alpha:
+        # resize() pada RGBA besar jauh lebih lambat daripada reduce() lalu resize dari gambar kecil
+        factor = (max(img.width // (3 * target_size[0]), 1), max(img.height // (3 * target_size[1]), 1))
+        if factor != (1, 1):
+            img = img.reduce(factor)
+    img = img.resize(target_size, resample, reducing_gap=3.0)
+    if has_alpha:
+        # Latar transparan diganti putih (setelah resize, jadi hanya 224x224 piksel)
+        background = Image.new('RGBA', img.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, img).convert('RGB')
+    return np.asarray(img, dtype=np.uint8)
+
+# Rescale batch uint8 ke float32 [0, 1] dalam satu operasi vectorized tanpa salinan perantara
+def rescale_batch(batch):
+    img_array = np.empty(batch.shape, dtype=np.float32)
+    np.multiply(batch, np.float32(1.0 / 255.0), out=img_array)
+    return img_array
+
 # Function to preprocess image for model prediction
 def load_and_preprocess_image(img, target_size=(224, 224)):
-    img = img.resize(target_size)
-    img_array = image.img_to_array(img)
-    img_array = np.expand_dims(img_array, axis=0)
-    img_array /= 255.0
-    return img_array
+    with metrics.timed('decode'):
+        img_array = decode_image(img, target_size)
+    with metrics.timed('preprocess'):
+        return rescale_batch(img_array[np.newaxis])
+
+# Function to preprocess a batch of images into one stacked float32 tensor
+def load_and_preprocess_images(imgs, target_size=(224, 224)):
+    batch = np.empty((len(imgs), target_size[1], target_size[0], 3), dtype=np.uint8)
+    for i, img in enumerate(imgs):
+        with metrics.timed('decode'):
+            batch[i] = decode_image(img, target_size)
+    with metrics.timed('preprocess'):
+        return rescale_batch(batch)
+
+# Decode satu gambar; gambar yang rusak menghasilkan None (error-nya sudah dicatat oleh metrics.timed)
+def _try_decode(img, target_size=(224, 224)):
+    try:
+        with metrics.timed('decode'):
+            return decode_image(img, target_size)
+    except Exception:
+        return None
+
+# Function to predict the classes of many images, one forward pass per chunk.
+# Setiap gambar di-decode sendiri-sendiri: gambar yang gagal di-decode menghasilkan None tanpa
+# menggagalkan gambar lain di chunk yang sama.
+# Dengan model gabungan (get_joint_model), embedding tiap gambar (None untuk yang gagal) ditambahkan ke `embeddings`.
+def predict_image_classes(model, imgs, class_indices, batch_size=32, embeddings=None):
+    class_labels = {v: k for k, v in class_indices.items()}
+    results = []
+    for start in range(0, len(imgs), batch_size):
+        decoded = [_try_decode(img) for img in imgs[start:start + batch_size]]
+        ok = [i for i, img_array in enumerate(decoded) if img_array is not None]
+        chunk_results = [None] * len(decoded)
+        chunk_embeddings = [None] * len(decoded)
+        if ok:
+            with metrics.timed('preprocess'):
+                img_array = rescale_batch(np.stack([decoded[i] for i in ok]))
+            with metrics.timed('predict'):
+                outputs = model.predict_on_batch(img_array)
+            if embeddings is not None:
+                outputs, batch_embeddings = outputs
+                for i, embedding in zip(ok, np.asarray(batch_embeddings, dtype=np.float32)):
+                    chunk_embeddings[i] = embedding
+            prediction = np.asarray(outputs)
+            predicted_class = np.argmax(prediction, axis=1)
+            confidence = prediction[np.arange(len(prediction)), predicted_class]
+            for i, c, p in zip(ok, predicted_class, confidence):
+                metrics.predictions.inc(**{'class': class_labels[c]})
+                chunk_results[i] = (class_labels[c], p)
+        results.extend(chunk_results)
+        if embeddings is not None:
+            embeddings.extend(chunk_embeddings)
+    return results
+
+# Test-time augmentation: view tambahan dari gambar yang sama, dinilai dalam satu batch.
+# 'flip' = gambar asli + cermin horizontal, 'crop' = gambar asli + 5 crop (tengah dan 4 sudut),
+# 'flip-crop' = keduanya beserta cerminnya (12 view)
+TTA_MODES = ('none', 'flip', 'crop', 'flip-crop')
+CROP_RATIO = 0.875
+
+def make_tta_views(source, tta='flip', target_size=(224, 224)):
+    if tta not in ('crop', 'flip-crop'):
+        views = [decode_image(source, target_size)]
+    else:
+        # Gambar hanya di-decode sekali pada ukuran crop; view utuh diperkecil dari hasil decode tersebut
+        width, height = target_size
+        large_size = (round(width / CROP_RATIO), round(height / CROP_RATIO))
+        large = decode_image(source, large_size)
+        views = [np.asarray(Image.fromarray(large).resize(target_size, Image.BICUBIC))]
+        dx, dy = large_size[0] - width, large_size[1] - height
+        for x, y in ((dx // 2, dy // 2), (0, 0), (dx, 0), (0, dy), (dx, dy)):
+            views.append(large[y:y + height, x:x + width])
+    if tta in ('flip', 'flip-crop'):
+        views += [view[:, ::-1] for view in views]
+    return np.stack(views)
+
+# Function to predict the top-k classes of one image, averaging all TTA views from one forward pass.
+# Dengan model gabungan, embedding view pertama (gambar utuh) ditambahkan ke list `embeddings`.
+def predict_image_topk(model, img, class_indices, k=3, tta='flip', embeddings=None):
+    with metrics.timed('decode'):
+        views = make_tta_views(img, tta)
+    with metrics.timed('preprocess'):
+        img_array = rescale_batch(views)
+    with metrics.timed('predict'):
+        outputs = model.predict_on_batch(img_array)
+    if embeddings is not None:
+        outputs, view_embeddings = outputs
+        embeddings.append(np.asarray(view_embeddings[0], dtype=np.float32))
+    prediction = np.asarray(outputs).mean(axis=0)
+    class_labels = {index: label for label, index in class_indices.items()}
+    top = np.argsort(prediction)[::-1][:k]
+    metrics.predictions.inc(**{'class': class_labels[top[0]]})
+    return [(class_labels[c], float(prediction[c])) for c in top]
 
 # Function to predict the image class
 def predict_image_class(model, img, class_indices):
     try:
         img_array = load_and_preprocess_image(img)
-        prediction = model.predict(img_array)
+        with metrics.timed('predict'):
+            prediction = model.predict(img_array, verbose=0)
         predicted_class = np.argmax(prediction, axis=1)
         class_labels = {v: k for k, v in class_indices.items()}
         confidence = prediction[0][predicted_class[0]]
+        metrics.predictions.inc(**{'class': class_labels[predicted_class[0]]})
         return class_labels[predicted_class[0]], confidence
     except Exception as e:
         st.error("Terdapat kesalahan dalam pemrosesan gambar, Mohon gunakan gambar yang sesuai")
         return None, None
 
-# Set background color for the header
-st.markdown(
-    """
-    <style>
-    .header {
-        background-color: #0F52BA;
-        padding: 20px;
-        border-radius: 10px;
-    }
-    .header h1 {
-        font-family: 'Arial Black', sans-serif;
-        font-size: 50px;
-        text-align: center;
-    }
-    .header p {
-        text-align: center;
-    }
-    .upload-box {
-        display: flex;
-        justify-content: center;
-        align-items: center;
-        height: 300px;
-        border: 2px dashed #CCCCCC;
-        border-radius: 10px;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
-
-# Header section with background color
-st.markdown(
-    """
-    <div class="header">
-        <h1>SiBetta</h1>
-        <p>Teman Setia Pecinta Cupang!</p>
-        <p>Aplikasi web inovatif yang menggunakan teknologi AI untuk membantu Anda mengidentifikasi jenis ikan cupang dengan cepat dan mudah. 
-        Aplikasi ini dirancang untuk pedagang ikan, pembeli ikan cupang, dan pecinta ikan cupang di seluruh Indonesia. 
-        Ada 10 jenis ikan yang dapat dideteksi: coccina, crown tail, double tail, halfmoon, halfsun, paradise, plakat, snakehead, spade tail, veil tail</p>
-    </div>
-    """,
-    unsafe_allow_html=True
-)
-
-st.write("")
-st.write("## Coba Sekarang!!!")
-# Upload box for images
-uploaded_file = st.file_uploader("Masukkan Gambar", type=["jpg", "jpeg", "png"])
-if uploaded_file is not None:
-    img = Image.open(uploaded_file)
-    st.image(img, caption='Gambar yang diunggah.', use_column_width=True)
-        
-    st.write("Mengolah gambar...")
-    predicted_class, confidence = predict_image_class(model, img, class_indices)
-    st.write(f'Hasil Prediksi: {predicted_class}')
-    st.write(f'Tingkat Kemiripan: {confidence * 100:.2f}%')
+# Function to find, for each image, the most similar reference from train/ and a near-duplicate earlier upload.
+# `embeddings` berasal dari forward pass gabungan atau dari cache prediksi; referensi termirip disimpan
+# di cache bersama embedding-nya sehingga rerun tidak mencari ulang.
+def find_similar_images(model_hash, image_hashes, embeddings):
+    cache = get_prediction_cache(model_hash)
+    embeddings = np.stack(embeddings)
+    similar = [cache.get_similarity(image_hash) for image_hash in image_hashes]
+    new = [i for i, entry in enumerate(similar) if entry is None]
+    if new:
+        reference_index = get_reference_index(model_hash)
+        with metrics.timed('embed'):
+            references = reference_index.search(embeddings[new], k=1) if reference_index else [[]] * len(new)
+        for i, reference in zip(new, references):
+            similar[i] = (embeddings[i], reference[0] if reference else None)
+            cache.put_similarity(image_hashes[i], *similar[i])
+
+    upload_index = get_upload_index(model_hash)
+    if upload_index is None:
+        return [(reference, None) for _, reference in similar]
+    # Gambar yang sudah diunggah di sesi ini tidak dianggap duplikat dirinya sendiri saat halaman dimuat ulang
+    seen = st.session_state.setdefault('seen_uploads', set())
+    results = []
+    with metrics.timed('embed'):
+        matches = upload_index.search(embeddings, k=2)
+    for image_hash, (_, reference), image_matches in zip(image_hashes, similar, matches):
+        duplicate = next((match for match in image_matches
+                          if match[1] >= duplicate_threshold and (match[0] != image_hash or image_hash not in seen)), None)
+        results.append((reference, duplicate))
+
+    new = [i for i, image_hash in enumerate(image_hashes) if image_hash not in upload_index]
+    if new:
+        upload_index.add([image_hashes[i] for i in new], embeddings[new])
+        upload_index.trim(upload_index_size)
+    seen.update(image_hashes)
+    return results
+
+# Function to show the description of a predicted class
+def show_class_description(predicted_class):
     if predicted_class == 'paradise':
         st.markdown(
             """
@@ -464,3 +743,236 @@ if uploaded_file is not None:
     # ... Add similar else if statements for each class in class_indices
     else:
         st.write('Deskripsi untuk kelas ini belum tersedia.')
+
+# Mode kamera: setiap foto dari st.camera_input adalah satu frame. Classifier disimpan di session_state
+# sehingga label dihaluskan antar foto dan foto yang hampir sama dengan sebelumnya tidak dinilai ulang.
+def show_camera_stream(loader):
+    snapshot = st.camera_input("Arahkan kamera ke ikan cupang")
+    if snapshot is None:
+        return
+    try:
+        with st.spinner("Memuat model..."):
+            model = loader.wait()
+    except Exception as e:
+        st.error(f"Model gagal dimuat: {e}")
+        return
+    stream = st.session_state.get('camera_stream')
+    if stream is None:
+        stream = st.session_state['camera_stream'] = StreamClassifier(
+            model, load_and_preprocess_images, class_indices, batch_size=1)
+    try:
+        predicted_class, confidence = stream.feed(Image.open(snapshot).convert('RGB'), time.time())
+    except Exception as e:
+        metrics.count_error('stream', e)
+        st.error("Terdapat kesalahan dalam pemrosesan gambar dari kamera")
+        return
+    stats = stream.stats()
+    st.write(f'Hasil Prediksi: {predicted_class}')
+    st.write(f'Tingkat Kemiripan: {confidence * 100:.2f}%')
+    st.caption(f"{stats['frames']} foto, {stats['inferred']} dinilai ({stats['inferred_fraction'] * 100:.0f}%)")
+    show_class_description(predicted_class)
+
+# Mode video: frame dibaca satu per satu dari file sementara, hanya frame yang berubah yang dinilai (dalam batch)
+def show_video_stream(loader):
+    video = st.file_uploader("Masukkan Video", type=["mp4", "avi", "mov", "mkv", "webm", "gif"])
+    if video is None:
+        return
+    try:
+        with st.spinner("Memuat model..."):
+            model = loader.wait()
+    except Exception as e:
+        st.error(f"Model gagal dimuat: {e}")
+        return
+    stream = StreamClassifier(model, load_and_preprocess_images, class_indices)
+    frame_placeholder = st.empty()
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(video.name)[1].lower()) as f:
+        f.write(video.getvalue())
+        f.flush()
+        try:
+            inferred = 0
+            for timestamp, frame in iter_video_frames(f.name):
+                predicted_class, confidence = stream.feed(frame, timestamp)
+                # Tampilan hanya diperbarui setelah batch baru dinilai
+                if stream.inferred != inferred:
+                    inferred = stream.inferred
+                    frame_placeholder.image(frame, use_column_width=True,
+                                            caption=f'{timestamp:.1f} detik: {predicted_class} ({confidence * 100:.1f}%)')
+            stream.flush()
+        except Exception as e:
+            metrics.count_error('stream', e)
+            st.error("Terdapat kesalahan dalam pemrosesan video, Mohon gunakan video yang sesuai")
+            return
+    stats = stream.stats()
+    if stats['dominant_label'] is None:
+        st.error("Tidak ada frame yang bisa dibaca dari video ini")
+        return
+    st.write(f"Hasil Prediksi: {stats['dominant_label']}")
+    st.caption(f"{stats['frames']} frame ({stats['stream_seconds']:.1f} detik video), "
+               f"{stats['inferred']} dinilai ({stats['inferred_fraction'] * 100:.0f}%), "
+               f"{stats['effective_fps']:.1f} frame/detik")
+    show_class_description(stats['dominant_label'])
+
+# Halaman utama aplikasi Streamlit
+def main():
+    start_metrics_exporter()
+    loader = get_model_loader()
+
+    # Set background color for the header
+    st.markdown(
+        """
+        <style>
+        .header {
+            background-color: #0F52BA;
+            padding: 20px;
+            border-radius: 10px;
+        }
+        .header h1 {
+            font-family: 'Arial Black', sans-serif;
+            font-size: 50px;
+            text-align: center;
+        }
+        .header p {
+            text-align: center;
+        }
+        .upload-box {
+            display: flex;
+            justify-content: center;
+            align-items: center;
+            height: 300px;
+            border: 2px dashed #CCCCCC;
+            border-radius: 10px;
+        }
+        </style>
+        """,
+        unsafe_allow_html=True
+    )
+
+    # Header section with background color
+    st.markdown(
+        """
+        <div class="header">
+            <h1>SiBetta</h1>
+            <p>Teman Setia Pecinta Cupang!</p>
+            <p>Aplikasi web inovatif yang menggunakan teknologi AI untuk membantu Anda mengidentifikasi jenis ikan cupang dengan cepat dan mudah. 
+            Aplikasi ini dirancang untuk pedagang ikan, pembeli ikan cupang, dan pecinta ikan cupang di seluruh Indonesia. 
+            Ada 10 jenis ikan yang dapat dideteksi: coccina, crown tail, double tail, halfmoon, halfsun, paradise, plakat, snakehead, spade tail, veil tail</p>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+    st.write("")
+    st.write("## Coba Sekarang!!!")
+    source = st.radio("Sumber gambar", ["Unggah gambar", "Kamera", "Video"], horizontal=True)
+    uploaded_files = None
+    if source == "Kamera":
+        show_camera_stream(loader)
+    elif source == "Video":
+        show_video_stream(loader)
+    else:
+        # Upload box for images
+        uploaded_files = st.file_uploader("Masukkan Gambar", type=["jpg", "jpeg", "png"], accept_multiple_files=True)
+        tta = st.selectbox("Mode TTA (lebih akurat untuk jenis yang mirip, sedikit lebih lambat)", TTA_MODES)
+    if uploaded_files:
+        try:
+            with st.spinner("Memuat model..."):
+                model = loader.wait()
+        except Exception as e:
+            st.error(f"Model gagal dimuat: {e}. Muat ulang halaman untuk mencoba lagi.")
+            return
+        image_hashes = [hash_bytes(uploaded_file.getvalue()) for uploaded_file in uploaded_files]
+        cache = get_prediction_cache(loader.model_hash)
+        # Jika gambar referensi aktif, klasifikasi dan embedding dihitung dalam satu forward pass
+        with_similarity = similarity_enabled()
+        if with_similarity:
+            model = get_joint_model(model)
+        embeddings = [None] * len(uploaded_files)
+        if tta != 'none':
+            # Hasil TTA tidak disimpan di cache prediksi karena bergantung pada mode yang dipilih
+            results = []
+            for i, uploaded_file in enumerate(uploaded_files):
+                view_embeddings = [] if with_similarity else None
+                try:
+                    with metrics.maybe_profile('upload'):
+                        results.append(predict_image_topk(
+                            model, uploaded_file, class_indices, k=3, tta=tta, embeddings=view_embeddings))
+                    if with_similarity:
+                        embeddings[i] = view_embeddings[0]
+                except Exception as e:
+                    metrics.count_error('upload', e)
+                    st.error("Terdapat kesalahan dalam pemrosesan gambar, Mohon gunakan gambar yang sesuai")
+                    results.append(None)
+        else:
+            results = [cache.get(image_hash) for image_hash in image_hashes]
+            if with_similarity:
+                for i, image_hash in enumerate(image_hashes):
+                    entry = cache.get_similarity(image_hash)
+                    if entry is not None:
+                        embeddings[i] = entry[0]
+            # Cache hit (prediksi dan embedding) tidak di-decode maupun dihitung ulang
+            misses = [i for i, result in enumerate(results)
+                      if result is None or (with_similarity and embeddings[i] is None)]
+
+            if misses:
+                st.write("Mengolah gambar...")
+                try:
+                    imgs = [uploaded_files[i] for i in misses]
+                    new_embeddings = [] if with_similarity else None
+                    with metrics.maybe_profile('upload'):
+                        predictions = predict_image_classes(model, imgs, class_indices, embeddings=new_embeddings)
+                    for i, result in zip(misses, predictions):
+                        if result is None:
+                            st.error(f"{uploaded_files[i].name}: Terdapat kesalahan dalam pemrosesan gambar, "
+                                     "Mohon gunakan gambar yang sesuai")
+                            continue
+                        cache.put(image_hashes[i], *result)
+                        results[i] = result
+                    if with_similarity:
+                        for i, embedding in zip(misses, new_embeddings):
+                            embeddings[i] = embedding
+                except Exception as e:
+                    metrics.count_error('upload', e)
+                    st.error("Terdapat kesalahan dalam pemrosesan gambar, Mohon gunakan gambar yang sesuai")
+            results = [[result] if result is not None else None for result in results]
+
+        ok = [i for i, result in enumerate(results) if result is not None and embeddings[i] is not None]
+        similar = [(None, None)] * len(uploaded_files)
+        if ok:
+            try:
+                found = find_similar_images(
+                    loader.model_hash, [image_hashes[i] for i in ok], [embeddings[i] for i in ok])
+                for i, pair in zip(ok, found):
+                    similar[i] = pair
+            except Exception as e:
+                metrics.count_error('embed', e)
+
+        for uploaded_file, top_k, (reference, duplicate) in zip(uploaded_files, results, similar):
+            if top_k is None:
+                continue
+            predicted_class, confidence = top_k[0]
+            if reference is not None:
+                upload_column, reference_column = st.columns(2)
+                upload_column.image(uploaded_file, caption='Gambar yang diunggah.', use_column_width=True)
+                reference_column.image(reference[0], use_column_width=True,
+                                       caption=f'Referensi termirip: {reference[0]} (kemiripan {reference[1] * 100:.1f}%)')
+            else:
+                st.image(uploaded_file, caption='Gambar yang diunggah.', use_column_width=True)
+            if duplicate is not None:
+                st.warning(f'Gambar ini hampir sama dengan gambar yang pernah diunggah (kemiripan {duplicate[1] * 100:.1f}%)')
+            st.write(f'Hasil Prediksi: {predicted_class}')
+            st.write(f'Tingkat Kemiripan: {confidence * 100:.2f}%')
+            if len(top_k) > 1:
+                st.write('Kemungkinan lain: ' + ', '.join(f'{label} ({p * 100:.2f}%)' for label, p in top_k[1:]))
+            show_class_description(predicted_class)
+
+        if tta == 'none':
+            st.caption(f'Cache prediksi: {cache.hits} hit, {cache.misses} miss')
+
+    if loader.time_to_ready is not None:
+        st.caption(f'Model {loader.backend} siap dalam {loader.time_to_ready:.1f} detik')
+    elif loader.error is None:
+        st.caption('Model sedang dimuat di latar belakang...')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,514 @@
+import argparse
+import http.client
+import io
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+from sibetta import (TTA_MODES, backend, class_indices, decode_image, load_and_preprocess_image, load_model_once,
+                     model_files, predict_image_class, predict_image_topk)
+from sibetta_data import list_images
+
+
+# Gambar contoh yang dipakai untuk membuat gambar besar sintetis
+SAMPLE_IMAGE = os.path.join('test', 'plakat', 'plakat_8.jpg')
+
+
+def percentiles(samples_ms):
+    samples = np.asarray(samples_ms)
+    return {
+        'mean_ms': float(np.mean(samples)),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'p99_ms': float(np.percentile(samples, 99)),
+    }
+
+# Puncak RSS proses ini dalam MB. Di Linux dibaca dari VmHWM (bisa di-reset lewat
+# reset_peak_rss), di OS lain dari ru_maxrss (KB di Linux, byte di macOS).
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+# Reset puncak RSS ke RSS saat ini (hanya Linux), agar puncak saat import tidak ikut terukur
+def reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+# Preprocessing sebelum fast path: decode penuh, resize, salinan float32, lalu /255.
+# convert('RGB') ditambahkan agar PNG RGBA bisa ikut dibandingkan.
+def baseline_preprocess(data):
+    img = Image.open(io.BytesIO(data)).convert('RGB')
+    img = img.resize((224, 224))
+    img_array = np.asarray(img, dtype=np.float32)
+    img_array = np.expand_dims(img_array, axis=0)
+    img_array /= 255.0
+    return img_array
+
+def fast_preprocess(data):
+    return load_and_preprocess_image(io.BytesIO(data))
+
+PREPROCESSORS = {'baseline': baseline_preprocess, 'fast': fast_preprocess}
+
+
+# Gambar besar seperti foto ponsel: JPEG 12 MP, JPEG 12 MP dengan orientasi EXIF, dan PNG RGBA
+def make_large_images(directory, sample=SAMPLE_IMAGE):
+    with Image.open(sample) as img:
+        large = img.convert('RGB').resize((4032, 3024), Image.BICUBIC)
+
+    paths = {}
+    paths['jpeg_12mp'] = os.path.join(directory, 'jpeg_12mp.jpg')
+    large.save(paths['jpeg_12mp'], quality=92)
+
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    paths['jpeg_12mp_exif'] = os.path.join(directory, 'jpeg_12mp_exif.jpg')
+    large.save(paths['jpeg_12mp_exif'], quality=92, exif=exif)
+
+    rgba = large.resize((3000, 2250)).convert('RGBA')
+    rgba.putalpha(200)
+    paths['png_rgba'] = os.path.join(directory, 'png_rgba.png')
+    rgba.save(paths['png_rgba'])
+    return paths
+
+
+# Diukur di proses terpisah agar puncak RSS satu varian tidak memengaruhi varian lain
+def _measure_preprocess(variant, path, repeat):
+    with open(path, 'rb') as f:
+        data = f.read()
+    preprocess = PREPROCESSORS[variant]
+    reset_peak_rss()
+    before = peak_rss_mb()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        preprocess(data)
+        latencies.append(1000.0 * (time.perf_counter() - start))
+    result = percentiles(latencies)
+    result['peak_rss_increase_mb'] = peak_rss_mb() - before
+    return result
+
+
+def bench_preprocess(repeat=20):
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, path in make_large_images(directory).items():
+            report[name] = {}
+            for variant in PREPROCESSORS:
+                child = subprocess.run(
+                    [sys.executable, __file__, 'preprocess-child', variant, path, str(repeat)],
+                    check=True, capture_output=True, text=True)
+                report[name][variant] = json.loads(child.stdout.strip().splitlines()[-1])
+    return report
+
+
+def run_preprocess(args):
+    report = bench_preprocess(args.repeat)
+    for name, variants in report.items():
+        for variant, row in variants.items():
+            print(f"{name:16s} {variant:8s} p50={row['p50_ms']:7.1f} ms p95={row['p95_ms']:7.1f} ms "
+                  f"peak RSS +{row['peak_rss_increase_mb']:.1f} MB")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'preprocess': report}, f, indent=2)
+
+
+# Label model pengganti di laporan benchmark: waktunya representatif, akurasinya tidak
+STAND_IN = 'stand-in (bobot acak, bukan best_model_16.h5)'
+
+# Model untuk benchmark. Tanpa best_model_16.h5 (misalnya di CI yang offline) dipakai model
+# pengganti dengan arsitektur identik (VGG16 + head) berbobot acak, jadi waktunya tetap representatif.
+# Hanya untuk mengukur waktu; pelatihan dan evaluasi harus memakai load_model_once.
+def load_benchmark_model(backend=backend):
+    if backend == 'keras' and not os.path.exists(model_files['keras']):
+        from tensorflow.keras.applications import VGG16
+        from sibetta_train import assemble_model, build_head
+
+        print(f'PERINGATAN: {model_files["keras"]} tidak ada, benchmark memakai model {STAND_IN}; '
+              'angka akurasi tidak bermakna', file=sys.stderr)
+        base_model = VGG16(weights=None, include_top=False, input_shape=(224, 224, 3))
+        return assemble_model(base_model, build_head()), STAND_IN
+    return load_model_once(backend), model_files[backend]
+
+
+def _time_stage(func, inputs, warmup=3):
+    for item in inputs[:warmup]:
+        func(item)
+    latencies = []
+    for item in inputs:
+        start = time.perf_counter()
+        func(item)
+        latencies.append(1000.0 * (time.perf_counter() - start))
+    return percentiles(latencies)
+
+
+def _throughput(model, images, batch_size, repeat):
+    batch = np.resize(images, (batch_size,) + images.shape[1:])
+    model.predict_on_batch(batch)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.predict_on_batch(batch)
+    return batch_size * repeat / (time.perf_counter() - start)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Benchmark tiap tahap pada gambar di test/: decode, load_and_preprocess_image, model.predict,
+# dan predict_image_class end-to-end, ditambah throughput per ukuran batch dan puncak RSS
+def bench_suite(test_dir='test', max_images=None, batch_sizes=(1, 8, 16, 32), repeat=5, backend=backend):
+    items = list_images(test_dir)[:max_images]
+    datas = []
+    for path, _ in items:
+        with open(path, 'rb') as f:
+            datas.append(f.read())
+
+    start = time.perf_counter()
+    model, model_source = load_benchmark_model(backend)
+    load_seconds = time.perf_counter() - start
+
+    preprocessed = [load_and_preprocess_image(io.BytesIO(data)) for data in datas]
+    stages = {
+        'decode': _time_stage(lambda data: decode_image(io.BytesIO(data)), datas),
+        'load_and_preprocess_image': _time_stage(
+            lambda data: load_and_preprocess_image(io.BytesIO(data)), datas),
+        'model.predict': _time_stage(model.predict_on_batch, preprocessed),
+        'predict_image_class': _time_stage(
+            lambda data: predict_image_class(model, io.BytesIO(data), class_indices), datas),
+    }
+
+    images = np.concatenate(preprocessed)
+    throughput = {str(batch_size): _throughput(model, images, batch_size, repeat) for batch_size in batch_sizes}
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'git_commit': _git_commit(),
+            'backend': backend,
+            'model': model_source,
+            'test_dir': test_dir,
+            'images': len(items),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'model_load_seconds': load_seconds,
+        'stages': stages,
+        'images_per_second': throughput,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_suite(args):
+    report = bench_suite(args.test_dir, args.max_images, args.batch_sizes, args.repeat, args.backend)
+    print(f"model: {report['meta']['model']} ({report['meta']['backend']}), {report['meta']['images']} gambar")
+    for name, row in report['stages'].items():
+        print(f"{name:26s} p50={row['p50_ms']:8.1f} ms p95={row['p95_ms']:8.1f} ms p99={row['p99_ms']:8.1f} ms")
+    for batch_size, images_per_second in report['images_per_second'].items():
+        print(f'batch {batch_size:>3s}: {images_per_second:7.1f} gambar/detik')
+    print(f"peak RSS: {report['peak_rss_mb']:.0f} MB")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+# Akurasi dan biaya latensi setiap mode TTA pada gambar test/, dibandingkan dengan tanpa TTA
+def bench_tta(test_dir='test', max_images=None, k=3, modes=TTA_MODES, backend=backend):
+    items = list_images(test_dir)[:max_images]
+    datas = []
+    for path, _ in items:
+        with open(path, 'rb') as f:
+            datas.append(f.read())
+    model, model_source = load_benchmark_model(backend)
+    predict_image_topk(model, io.BytesIO(datas[0]), class_indices, k, 'flip-crop')
+
+    report = {}
+    for mode in modes:
+        top1 = topk = 0
+        latencies = []
+        for data, (_, label) in zip(datas, items):
+            start = time.perf_counter()
+            top = predict_image_topk(model, io.BytesIO(data), class_indices, k, mode)
+            latencies.append(1000.0 * (time.perf_counter() - start))
+            labels = [class_indices[name] for name, _ in top]
+            top1 += labels[0] == label
+            topk += label in labels
+        row = percentiles(latencies)
+        row['top1_accuracy'] = top1 / len(items)
+        row[f'top{k}_accuracy'] = topk / len(items)
+        report[mode] = row
+
+    baseline = report[modes[0]]
+    for row in report.values():
+        row['top1_accuracy_delta'] = row['top1_accuracy'] - baseline['top1_accuracy']
+        row['latency_ratio'] = row['mean_ms'] / baseline['mean_ms']
+    return {'model': model_source, 'images': len(items), 'k': k, 'modes': report}
+
+
+def run_tta(args):
+    report = bench_tta(args.test_dir, args.max_images, args.k, args.modes, args.backend)
+    print(f"model: {report['model']}, {report['images']} gambar")
+    for mode, row in report['modes'].items():
+        print(f"{mode:10s} top1={row['top1_accuracy']:.4f} ({row['top1_accuracy_delta']:+.4f}) "
+              f"top{args.k}={row[f'top{args.k}_accuracy']:.4f} p50={row['p50_ms']:7.1f} ms "
+              f"p95={row['p95_ms']:7.1f} ms ({row['latency_ratio']:.2f}x)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'tta': report}, f, indent=2)
+
+
+# Latensi query indeks embedding untuk beberapa ukuran indeks (embedding sintetis)
+# Embedding sintetis berkelompok yang saling tumpang tindih (seperti fitur VGG16: non-negatif dan jarang)
+def _clustered_embeddings(rng, centers, n):
+    noise = rng.random((n, centers.shape[1]), dtype=np.float32) ** 4
+    return centers[rng.integers(len(centers), size=n)] + noise
+
+def bench_index(sizes=(1000, 10000, 100000), queries=50, k=5, dim=512, nprobe=None):
+    from sibetta_index import NPROBE, EmbeddingIndex, maybe_partition
+
+    nprobe = nprobe or NPROBE
+    rng = np.random.default_rng(0)
+    centers = rng.random((100, dim), dtype=np.float32) ** 4
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        index = EmbeddingIndex(directory, dim)
+        for size in sizes:
+            while len(index) < size:
+                n = min(10000, size - len(index))
+                index.add([f'{len(index) + i}.jpg' for i in range(n)], _clustered_embeddings(rng, centers, n))
+            maybe_partition(index)
+            start = time.perf_counter()
+            reopened = EmbeddingIndex(directory)
+            open_ms = 1000.0 * (time.perf_counter() - start)
+            start = time.perf_counter()
+            reopened.prepare()
+            prepare_ms = 1000.0 * (time.perf_counter() - start)
+
+            query = _clustered_embeddings(rng, centers, queries)
+            row = _time_stage(lambda q: reopened.search(q, k, nprobe), list(query))
+            # Recall@k terhadap pencarian eksak (semua partisi diperiksa)
+            found = reopened.search(query, k, nprobe)
+            exact = reopened.search(query, k, len(reopened.centroids)) if reopened.partitioned else found
+            recall = np.mean([len({p for p, _ in a} & {p for p, _ in b}) / len(b) for a, b in zip(found, exact)])
+            row.update({'open_ms': open_ms, 'prepare_ms': prepare_ms, 'recall': float(recall),
+                        'partitions': len(reopened.centroids) if reopened.partitioned else 0})
+            report[str(size)] = row
+    return report
+
+
+def run_index(args):
+    report = bench_index(args.sizes, args.queries, args.k, nprobe=args.nprobe)
+    for size, row in report.items():
+        print(f"{size:>7s} gambar: query p50={row['p50_ms']:6.2f} ms p95={row['p95_ms']:6.2f} ms, "
+              f"recall@{args.k}={row['recall']:.3f} ({row['partitions']} partisi), "
+              f"buka {row['open_ms']:.1f} ms, siapkan {row['prepare_ms']:.1f} ms")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'index': report}, f, indent=2)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _wait_for_server(port, process, timeout=600):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server berhenti dengan kode {process.returncode}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError(f'server di port {port} tidak siap dalam {timeout} detik')
+
+def _get_json(port, path):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    connection.request('GET', path)
+    return json.loads(connection.getresponse().read())
+
+# Klien dengan koneksi keep-alive yang mengirim gambar berulang-ulang sampai `stop` diset
+def _client(port, datas, stop, measuring, latencies, errors):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    i = 0
+    while not stop.is_set():
+        data = datas[i % len(datas)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            connection.request('POST', '/predict', body=data)
+            response = connection.getresponse()
+            response.read()
+            ok = response.status == 200
+        except OSError:
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port)
+            ok = False
+        if measuring.is_set():
+            if ok:
+                latencies.append(1000.0 * (time.perf_counter() - start))
+            else:
+                errors.append(1)
+    connection.close()
+
+# Beban konstan dari `concurrency` klien: `warmup` detik tidak diukur, lalu diukur selama `duration` detik
+def generate_load(port, datas, concurrency=16, duration=20.0, warmup=5.0):
+    stop, measuring = threading.Event(), threading.Event()
+    latencies, errors = [], []
+    clients = [threading.Thread(target=_client, args=(port, datas, stop, measuring, latencies, errors))
+               for _ in range(concurrency)]
+    for client in clients:
+        client.start()
+    time.sleep(warmup)
+    before = _get_json(port, '/stats')
+    measuring.set()
+    start = time.perf_counter()
+    time.sleep(duration)
+    measuring.clear()
+    elapsed = time.perf_counter() - start
+    after = _get_json(port, '/stats')
+    stop.set()
+    for client in clients:
+        client.join()
+
+    batches = after['batches'] - before['batches']
+    result = percentiles(latencies) if latencies else {}
+    result.update({
+        'requests_per_second': len(latencies) / elapsed,
+        'errors': len(errors),
+        'mean_batch_size': (after['images'] - before['images']) / batches if batches else 0.0,
+    })
+    return result
+
+
+# Throughput server untuk setiap kombinasi jumlah replika dan thread per replika
+def bench_load(replicas=(1, 2, 4), threads=(1, 2, 4), mode='process', pin=False, concurrency=16,
+               duration=20.0, warmup=5.0, test_dir='test', max_images=64, max_batch_size=16):
+    datas = []
+    for path, _ in list_images(test_dir)[:max_images]:
+        with open(path, 'rb') as f:
+            datas.append(f.read())
+
+    report = []
+    for replica_count in replicas:
+        for thread_count in threads:
+            port = _free_port()
+            command = [sys.executable, 'sibetta_server.py', '--port', str(port), '--replicas', str(replica_count),
+                       '--threads-per-replica', str(thread_count), '--replica-mode', mode,
+                       '--max-batch-size', str(max_batch_size)]
+            if pin:
+                command.append('--pin-cpus')
+            server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                _wait_for_server(port, server)
+                row = generate_load(port, datas, concurrency, duration, warmup)
+            finally:
+                server.terminate()
+                server.wait()
+            row.update({'replicas': replica_count, 'threads_per_replica': thread_count})
+            report.append(row)
+            print(f"replika={replica_count:2d} thread={thread_count:2d}: {row['requests_per_second']:7.1f} req/detik "
+                  f"p50={row.get('p50_ms', 0):8.1f} ms p95={row.get('p95_ms', 0):8.1f} ms "
+                  f"batch rata-rata={row['mean_batch_size']:.1f}", flush=True)
+    return {'mode': mode, 'pin_cpus': pin, 'concurrency': concurrency, 'cpu_count': os.cpu_count(), 'runs': report}
+
+
+def run_load(args):
+    report = bench_load(args.replicas, args.threads, args.mode, args.pin_cpus, args.concurrency,
+                        args.duration, args.warmup, args.test_dir, args.max_images, args.max_batch_size)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'load': report}, f, indent=2)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark inferensi SiBetta')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    preprocess_parser = subparsers.add_parser(
+        'preprocess', help='bandingkan preprocessing lama dan fast path pada gambar besar')
+    preprocess_parser.add_argument('--repeat', type=int, default=20)
+    preprocess_parser.add_argument('--output', help='simpan hasil sebagai JSON')
+    preprocess_parser.set_defaults(func=run_preprocess)
+
+    suite_parser = subparsers.add_parser('suite', help='benchmark per tahap pada gambar test/')
+    suite_parser.add_argument('--test-dir', default='test')
+    suite_parser.add_argument('--max-images', type=int, default=None)
+    suite_parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 16, 32])
+    suite_parser.add_argument('--repeat', type=int, default=5, help='jumlah pengulangan per ukuran batch')
+    suite_parser.add_argument('--backend', default=backend, choices=list(model_files))
+    suite_parser.add_argument('--output', help='simpan hasil sebagai JSON')
+    suite_parser.set_defaults(func=run_suite)
+
+    tta_parser = subparsers.add_parser('tta', help='akurasi dan latensi setiap mode TTA pada gambar test/')
+    tta_parser.add_argument('--test-dir', default='test')
+    tta_parser.add_argument('--max-images', type=int, default=None)
+    tta_parser.add_argument('--k', type=int, default=3, help='jumlah kelas teratas')
+    tta_parser.add_argument('--modes', nargs='+', default=list(TTA_MODES), choices=TTA_MODES,
+                            help='mode pertama dipakai sebagai pembanding')
+    tta_parser.add_argument('--backend', default=backend, choices=list(model_files))
+    tta_parser.add_argument('--output', help='simpan hasil sebagai JSON')
+    tta_parser.set_defaults(func=run_tta)
+
+    index_parser = subparsers.add_parser('index', help='latensi query indeks embedding untuk beberapa ukuran')
+    index_parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    index_parser.add_argument('--queries', type=int, default=50)
+    index_parser.add_argument('--k', type=int, default=5)
+    index_parser.add_argument('--nprobe', type=int, default=None, help='jumlah partisi yang diperiksa per query')
+    index_parser.add_argument('--output', help='simpan hasil sebagai JSON')
+    index_parser.set_defaults(func=run_index)
+
+    load_parser = subparsers.add_parser(
+        'load', help='beban HTTP ke sibetta_server.py untuk beberapa jumlah replika dan thread per replika')
+    load_parser.add_argument('--replicas', type=int, nargs='+', default=[1, 2, 4])
+    load_parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4], help='thread per replika')
+    load_parser.add_argument('--mode', choices=['process', 'thread'], default='process')
+    load_parser.add_argument('--pin-cpus', action='store_true')
+    load_parser.add_argument('--concurrency', type=int, default=16, help='jumlah klien bersamaan')
+    load_parser.add_argument('--duration', type=float, default=20.0, help='lama pengukuran per konfigurasi (detik)')
+    load_parser.add_argument('--warmup', type=float, default=5.0)
+    load_parser.add_argument('--max-batch-size', type=int, default=16)
+    load_parser.add_argument('--test-dir', default='test')
+    load_parser.add_argument('--max-images', type=int, default=64)
+    load_parser.add_argument('--output', help='simpan hasil sebagai JSON')
+    load_parser.set_defaults(func=run_load)
+
+    child_parser = subparsers.add_parser('preprocess-child')
+    child_parser.add_argument('variant', choices=list(PREPROCESSORS))
+    child_parser.add_argument('path')
+    child_parser.add_argument('repeat', type=int)
+    child_parser.set_defaults(func=lambda args: print(json.dumps(_measure_preprocess(args.variant, args.path, args.repeat))))
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    args.func(args)
@@ -0,0 +1,185 @@
+import argparse
+import csv
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from sibetta import class_indices, decode_image, load_model_once, rescale_batch
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+CSV_FIELDS = ['path', 'predicted_class', 'confidence', 'error']
+
+
+# Menelusuri folder secara berurutan sebagai generator (tidak menampung seluruh daftar file)
+def iter_image_paths(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+# Daftar (path, label) dari folder berstruktur <kelas>/*.jpg
+def list_images(root):
+    items = []
+    for class_name in sorted(os.listdir(root)):
+        class_dir = os.path.join(root, class_name)
+        if class_name not in class_indices or not os.path.isdir(class_dir):
+            continue
+        for name in sorted(os.listdir(class_dir)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                items.append((os.path.join(class_dir, name), class_indices[class_name]))
+    return items
+
+# Mengelompokkan generator menjadi list berukuran tetap
+def batched(iterable, batch_size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# Decode dan resize satu gambar di proses worker, hasilnya uint8 agar murah dikirim antar proses
+def decode_path(path, target_size=(224, 224)):
+    try:
+        return decode_image(path, target_size), None
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+# Hapus baris terakhir yang terpotong jika run sebelumnya berhenti di tengah penulisan
+def truncate_partial_line(path):
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+# Kumpulan path yang sudah ada di file output (untuk melanjutkan run)
+def load_done_paths(path, fmt):
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, newline='') as f:
+        if fmt == 'csv':
+            for row in csv.DictReader(f):
+                done.add(row['path'])
+        else:
+            for line in f:
+                if line.strip():
+                    done.add(json.loads(line)['path'])
+    return done
+
+
+class ResultWriter:
+    def __init__(self, path, fmt):
+        self.fmt = fmt
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'a', newline='')
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS)
+            if is_new:
+                self.writer.writeheader()
+
+    def write(self, record):
+        if self.fmt == 'csv':
+            self.writer.writerow(record)
+        else:
+            self.file.write(json.dumps(record) + '\n')
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+def classify_tree(root, output, fmt='jsonl', batch_size=32, workers=None, prefetch=2):
+    truncate_partial_line(output)
+    done = load_done_paths(output, fmt)
+    class_labels = {v: k for k, v in class_indices.items()}
+
+    paths = (
+        path for path in iter_image_paths(root)
+        if os.path.relpath(path, root).replace(os.sep, '/') not in done
+    )
+
+    processed = 0
+    start = time.perf_counter()
+    writer = ResultWriter(output, fmt)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Buat proses worker sebelum TensorFlow memuat model
+        pool.submit(int).result()
+        model = load_model_once()
+
+        # Antrian batch yang sedang di-decode; dibatasi agar memori tetap datar
+        pending = deque()
+        batches = batched(paths, batch_size)
+        for batch_paths in batches:
+            pending.append((batch_paths, [pool.submit(decode_path, path) for path in batch_paths]))
+            if len(pending) < prefetch:
+                continue
+            processed += _predict_batch(model, class_labels, root, writer, *pending.popleft())
+            _report(processed, len(done), start)
+
+        while pending:
+            processed += _predict_batch(model, class_labels, root, writer, *pending.popleft())
+            _report(processed, len(done), start)
+
+    writer.close()
+    return processed
+
+
+def _predict_batch(model, class_labels, root, writer, batch_paths, futures):
+    decoded = [future.result() for future in futures]
+    records = [{'path': os.path.relpath(path, root).replace(os.sep, '/')} for path in batch_paths]
+
+    ok = [i for i, (img_array, _) in enumerate(decoded) if img_array is not None]
+    for i, (_, error) in enumerate(decoded):
+        if error is not None:
+            records[i]['error'] = error
+
+    if ok:
+        inputs = rescale_batch(np.stack([decoded[i][0] for i in ok]))
+        prediction = np.asarray(model.predict_on_batch(inputs))
+        predicted_class = np.argmax(prediction, axis=1)
+        for i, row, c in zip(ok, prediction, predicted_class):
+            records[i]['predicted_class'] = class_labels[c]
+            records[i]['confidence'] = round(float(row[c]), 6)
+
+    for record in records:
+        writer.write(record)
+    writer.flush()
+    return len(records)
+
+
+def _report(processed, skipped, start):
+    elapsed = time.perf_counter() - start
+    print(f'\r{processed} gambar diproses ({skipped} dilewati), {processed / elapsed:.1f} gambar/detik', end='', flush=True)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Klasifikasi massal seluruh gambar dalam sebuah folder')
+    parser.add_argument('root', help='folder gambar, misalnya test/ atau train/')
+    parser.add_argument('-o', '--output', required=True, help='file hasil (.jsonl atau .csv)')
+    parser.add_argument('--format', choices=['jsonl', 'csv'],
+                        help='format output (default: ditentukan dari ekstensi file output)')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='jumlah proses untuk decode dan resize (default: jumlah CPU)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    fmt = args.format or ('csv' if args.output.lower().endswith('.csv') else 'jsonl')
+    processed = classify_tree(args.root, args.output, fmt, args.batch_size, args.workers)
+    print(f'\nSelesai: {processed} gambar baru ditulis ke {args.output}')
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+# Hash sha256 dari bytes gambar yang diunggah
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+# Hash sha256 dari file (dibaca per potongan agar hemat memori)
+def hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Cache hasil prediksi berdasarkan (hash model, hash gambar).
+# Tingkat pertama adalah LRU di memori, tingkat kedua (opsional) berupa
+# file JSON di disk sehingga tetap ada setelah aplikasi di-restart.
+class PredictionCache:
+    def __init__(self, model_hash, max_entries=1024, cache_dir=None):
+        self.model_hash = model_hash
+        self.max_entries = max_entries
+        self.cache_dir = None
+        if cache_dir:
+            self.cache_dir = os.path.join(cache_dir, model_hash[:16])
+            os.makedirs(self.cache_dir, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._similar = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _disk_path(self, image_hash):
+        return os.path.join(self.cache_dir, image_hash[:2], image_hash + '.json')
+
+    def _remember(self, image_hash, result):
+        self._entries[image_hash] = result
+        self._entries.move_to_end(image_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, image_hash):
+        with self._lock:
+            result = self._entries.get(image_hash)
+            if result is not None:
+                self._entries.move_to_end(image_hash)
+                self.hits += 1
+                return result
+
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(image_hash)) as f:
+                    entry = json.load(f)
+                result = (entry['predicted_class'], entry['confidence'])
+            except (OSError, ValueError, KeyError):
+                result = None
+            if result is not None:
+                with self._lock:
+                    self._remember(image_hash, result)
+                    self.hits += 1
+                return result
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, image_hash, predicted_class, confidence):
+        result = (predicted_class, float(confidence))
+        with self._lock:
+            self._remember(image_hash, result)
+
+        if self.cache_dir:
+            path = self._disk_path(image_hash)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'predicted_class': result[0], 'confidence': result[1]}, f)
+            os.replace(tmp_path, path)
+
+    # Embedding gambar dan referensi termirip dari train/, disimpan di samping prediksi (hanya di memori)
+    def get_similarity(self, image_hash):
+        with self._lock:
+            entry = self._similar.get(image_hash)
+            if entry is not None:
+                self._similar.move_to_end(image_hash)
+            return entry
+
+    def put_similarity(self, image_hash, embedding, reference):
+        with self._lock:
+            self._similar[image_hash] = (embedding, reference)
+            self._similar.move_to_end(image_hash)
+            while len(self._similar) > self.max_entries:
+                self._similar.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
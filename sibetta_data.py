@@ -0,0 +1,194 @@
+import argparse
+import itertools
+import json
+import math
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from sibetta import class_indices
+from sibetta_bulk import list_images
+
+
+TARGET_SIZE = (224, 224)
+
+# Augmentasi yang sama dengan train_datagen di sibetta_training.ipynb (tanpa rescale)
+AUGMENTATION = dict(
+    rotation_range=40,
+    width_shift_range=0.2,
+    height_shift_range=0.2,
+    shear_range=0.2,
+    zoom_range=0.2,
+    horizontal_flip=True,
+    vertical_flip=True,
+    fill_mode='nearest',
+)
+
+
+# Decode JPEG/PNG dan resize di dalam graph TensorFlow; interpolasi nearest
+# seperti default flow_from_directory. Disimpan sebagai uint8 agar cache() hemat memori.
+def _decode(path, label, target_size):
+    img = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    img = tf.image.resize(img, target_size, method='nearest')
+    img = tf.cast(img, tf.uint8)
+    img.set_shape(target_size + (3,))
+    return img, tf.one_hot(label, len(class_indices))
+
+
+# Augmentasi acak untuk satu batch sekaligus: rotasi, geser, shear, zoom
+# digabung jadi satu transformasi affine per gambar, lalu flip horizontal/vertikal
+def augment_batch(images, augmentation=AUGMENTATION, seed=None):
+    n = tf.shape(images)[0]
+    height = tf.cast(tf.shape(images)[1], tf.float32)
+    width = tf.cast(tf.shape(images)[2], tf.float32)
+
+    # Setiap operasi acak butuh seed sendiri; dengan seed yang sama semua nilai acaknya identik
+    op_seeds = itertools.repeat(None) if seed is None else itertools.count(seed)
+
+    def uniform(limit):
+        return tf.random.uniform([n], -limit, limit, seed=next(op_seeds))
+
+    theta = uniform(augmentation['rotation_range'] * math.pi / 180)
+    shear = uniform(augmentation['shear_range'] * math.pi / 180)
+    zoom_x = 1.0 + uniform(augmentation['zoom_range'])
+    zoom_y = 1.0 + uniform(augmentation['zoom_range'])
+    shift_x = uniform(augmentation['width_shift_range']) * width
+    shift_y = uniform(augmentation['height_shift_range']) * height
+
+    zeros, ones = tf.zeros([n]), tf.ones([n])
+    rotation = tf.reshape(tf.stack([tf.cos(theta), -tf.sin(theta), tf.sin(theta), tf.cos(theta)], axis=1), [n, 2, 2])
+    shearing = tf.reshape(tf.stack([ones, -tf.sin(shear), zeros, tf.cos(shear)], axis=1), [n, 2, 2])
+    zooming = tf.reshape(tf.stack([zoom_x, zeros, zeros, zoom_y], axis=1), [n, 2, 2])
+    matrix = rotation @ shearing @ zooming
+
+    # Transformasi dari koordinat output ke input, berpusat di tengah gambar
+    cx, cy = (width - 1) / 2, (height - 1) / 2
+    a0, a1 = matrix[:, 0, 0], matrix[:, 0, 1]
+    b0, b1 = matrix[:, 1, 0], matrix[:, 1, 1]
+    a2 = cx - a0 * cx - a1 * cy + shift_x
+    b2 = cy - b0 * cx - b1 * cy + shift_y
+    transforms = tf.stack([a0, a1, a2, b0, b1, b2, zeros, zeros], axis=1)
+
+    images = tf.raw_ops.ImageProjectiveTransformV3(
+        images=tf.cast(images, tf.float32),
+        transforms=transforms,
+        output_shape=tf.shape(images)[1:3],
+        fill_value=0.0,
+        interpolation='BILINEAR',
+        fill_mode=augmentation['fill_mode'].upper(),
+    )
+
+    if augmentation['horizontal_flip']:
+        flip = tf.random.uniform([n], seed=next(op_seeds)) < 0.5
+        images = tf.where(flip[:, None, None, None], tf.reverse(images, axis=[2]), images)
+    if augmentation['vertical_flip']:
+        flip = tf.random.uniform([n], seed=next(op_seeds)) < 0.5
+        images = tf.where(flip[:, None, None, None], tf.reverse(images, axis=[1]), images)
+    return images
+
+
+# Pipeline input tf.data pengganti ImageDataGenerator.flow_from_directory.
+# cache: None (tanpa cache), '' (cache di memori), atau path file cache di disk.
+def make_dataset(directory, batch_size=32, target_size=TARGET_SIZE, augment=False,
+                 shuffle=True, cache=None, shuffle_buffer=None, seed=None):
+    from sibetta_shards import is_shard_dir
+
+    if is_shard_dir(directory):
+        return make_shard_dataset(directory, batch_size, augment, shuffle, seed)
+    items = list_images(directory)
+    paths = [path for path, _ in items]
+    labels = [label for _, label in items]
+    buffer_size = shuffle_buffer or len(items)
+
+    dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+    # Tanpa cache, urutan file diacak dulu supaya decode paralel langsung menghasilkan urutan acak
+    if shuffle and cache is None:
+        dataset = dataset.shuffle(buffer_size, seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.map(lambda path, label: _decode(path, label, target_size),
+                          num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle)
+    if cache is not None:
+        dataset = dataset.cache(cache)
+        if shuffle:
+            dataset = dataset.shuffle(buffer_size, seed=seed, reshuffle_each_iteration=True)
+
+    return _augment_and_rescale(dataset.batch(batch_size), augment, seed)
+
+
+# Pipeline yang sama dari shard hasil sibetta_shards.py: gambar sudah di-decode dan di-resize,
+# jadi tiap batch hanya diambil dari memmap (indeks acak per epoch jika shuffle)
+def make_shard_dataset(shard_dir, batch_size=32, augment=False, shuffle=True, seed=None):
+    from sibetta_shards import ShardDataset
+
+    shards = ShardDataset(shard_dir)
+    image_shape = tuple(shards.index['image_shape'])
+
+    def take(indices):
+        images, labels = shards.take(indices)
+        return images, np.eye(len(class_indices), dtype=np.float32)[labels]
+
+    def load(indices):
+        images, labels = tf.numpy_function(take, [indices], [tf.uint8, tf.float32])
+        images.set_shape((None,) + image_shape)
+        labels.set_shape((None, len(class_indices)))
+        return images, labels
+
+    dataset = tf.data.Dataset.range(len(shards))
+    if shuffle:
+        dataset = dataset.shuffle(len(shards), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size).map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle)
+    return _augment_and_rescale(dataset, augment, seed)
+
+def _augment_and_rescale(dataset, augment, seed):
+    if augment:
+        dataset = dataset.map(lambda x, y: (augment_batch(x, seed=seed) / 255.0, y),
+                              num_parallel_calls=tf.data.AUTOTUNE)
+    else:
+        dataset = dataset.map(lambda x, y: (tf.cast(x, tf.float32) / 255.0, y),
+                              num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def _images_per_second(batches, steps):
+    # Batch pertama tidak dihitung (inisialisasi worker / pengisian cache)
+    next(batches)
+    images = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        x, _ = next(batches)
+        images += len(x)
+    return images / (time.perf_counter() - start)
+
+
+# Bandingkan throughput ImageDataGenerator dengan pipeline tf.data pada folder yang sama
+def benchmark(directory, batch_size=32, steps=50):
+    from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+    generator = ImageDataGenerator(rescale=1.0 / 255.0, **AUGMENTATION).flow_from_directory(
+        directory, target_size=TARGET_SIZE, batch_size=batch_size, class_mode='categorical', color_mode='rgb')
+    results = {'ImageDataGenerator': _images_per_second(iter(generator), steps)}
+
+    for name, cache in (('tf.data', None), ('tf.data+cache', '')):
+        dataset = make_dataset(directory, batch_size, augment=True, cache=cache).repeat()
+        results[name] = _images_per_second(iter(dataset), steps)
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark pipeline input tf.data vs ImageDataGenerator')
+    parser.add_argument('--train-dir', default='train')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--steps', type=int, default=50, help='jumlah batch yang diukur per pipeline')
+    parser.add_argument('--output', help='simpan hasil sebagai JSON')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    results = benchmark(args.train_dir, args.batch_size, args.steps)
+    for name, images_per_second in results.items():
+        print(f'{name:20s} {images_per_second:8.1f} gambar/detik')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'train_dir': args.train_dir, 'batch_size': args.batch_size, 'steps': args.steps,
+                       'images_per_second': results}, f, indent=2)
@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from sibetta import class_indices, load_model_once, model_files
+from sibetta_bench import load_benchmark_model, peak_rss_mb, percentiles, reset_peak_rss
+from sibetta_data import TARGET_SIZE
+from sibetta_shards import iter_labeled_batches
+
+
+# Student kecil yang dilatih dengan model VGG16 saat ini sebagai teacher.
+# 'mobilenet': MobileNetV2 (lebar alpha) + global average pooling, input [0, 1] diubah ke [-1, 1] di dalam model.
+# 'vgg-gap': konvolusi VGG16 dari teacher + global average pooling, menggantikan Flatten -> Dense(512)
+# (25088x512 bobot) dengan Dense(10) di atas 512 fitur.
+# Keduanya mengeluarkan logit; softmax ditambahkan saat model disimpan untuk dipakai aplikasi.
+def build_student(kind='mobilenet', teacher=None, alpha=0.35, weights='imagenet', dropout=0.2):
+    from tensorflow.keras.applications import MobileNetV2
+    from tensorflow.keras.layers import Dense, Dropout, GlobalAveragePooling2D, Input, Rescaling
+    from tensorflow.keras.models import Model, clone_model
+
+    inputs = Input(shape=TARGET_SIZE + (3,))
+    if kind == 'mobilenet':
+        base_model = MobileNetV2(input_shape=TARGET_SIZE + (3,), alpha=alpha, include_top=False, weights=weights)
+        x = base_model(Rescaling(2.0, offset=-1.0)(inputs))
+    else:
+        base_model = clone_model(teacher.layers[0])
+        base_model.set_weights(teacher.layers[0].get_weights())
+        x = base_model(inputs)
+    x = GlobalAveragePooling2D()(x)
+    x = Dropout(dropout)(x)
+    logits = Dense(len(class_indices))(x)
+    return Model(inputs, logits, name=f'student_{kind}')
+
+# Model siap pakai: logit student + softmax, dengan input dan output yang sama seperti model VGG16
+def serving_model(student):
+    from tensorflow.keras.layers import Softmax
+    from tensorflow.keras.models import Model
+
+    return Model(student.input, Softmax()(student.output), name=student.name)
+
+
+def _distiller_class():
+    import tensorflow as tf
+
+    # Loss = alpha * cross-entropy terhadap label + (1 - alpha) * KL(teacher || student) pada suhu T.
+    # Teacher hanya mengeluarkan softmax, jadi logitnya diambil kembali dengan log(p).
+    class Distiller(tf.keras.Model):
+        def __init__(self, student, teacher, temperature=4.0, alpha=0.1):
+            super().__init__()
+            self.student = student
+            self.teacher = teacher
+            self.teacher.trainable = False
+            self.temperature = temperature
+            self.alpha = alpha
+
+        def call(self, x, training=False):
+            return self.student(x, training=training)
+
+        def compute_loss(self, x=None, y=None, y_pred=None, sample_weight=None, training=True):
+            teacher_logits = tf.math.log(tf.clip_by_value(self.teacher(x, training=False), 1e-7, 1.0))
+            student_loss = tf.keras.losses.categorical_crossentropy(y, y_pred, from_logits=True)
+            distillation_loss = tf.keras.losses.kullback_leibler_divergence(
+                tf.nn.softmax(teacher_logits / self.temperature), tf.nn.softmax(y_pred / self.temperature))
+            return tf.reduce_mean(
+                self.alpha * student_loss + (1 - self.alpha) * distillation_loss * self.temperature ** 2)
+
+    return Distiller
+
+
+def distill(teacher, train_dir='train', test_dir='test', kind='mobilenet', alpha=0.35, weights='imagenet',
+            epochs=30, batch_size=32, learning_rate=0.001, temperature=4.0, loss_alpha=0.1, patience=None,
+            output=model_files['student']):
+    from tensorflow.keras.callbacks import EarlyStopping
+    from tensorflow.keras.optimizers import Adam
+    from sibetta_data import make_dataset
+
+    student = build_student(kind, teacher, alpha, weights)
+    distiller = _distiller_class()(student, teacher, temperature, loss_alpha)
+    distiller.compile(optimizer=Adam(learning_rate=learning_rate), metrics=['categorical_accuracy'])
+    history = distiller.fit(
+        make_dataset(train_dir, batch_size, augment=True, cache=''),
+        validation_data=make_dataset(test_dir, batch_size, shuffle=False, cache=''),
+        epochs=epochs,
+        callbacks=[EarlyStopping(monitor='val_categorical_accuracy', mode='max',
+                                 patience=patience or epochs, restore_best_weights=True)],
+    )
+    serving_model(student).save(output)
+    return student, history
+
+
+# Akurasi, latensi, dan memori satu model, diukur di proses terpisah agar memorinya tidak tercampur
+def _measure_model(backend, test_dir, max_images, repeat):
+    import tensorflow  # noqa: F401  (memori TensorFlow sendiri tidak dihitung sebagai memori model)
+
+    reset_peak_rss()
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    model, source = load_benchmark_model(backend)
+    load_seconds = time.perf_counter() - start
+
+    correct = images = 0
+    for inputs, labels in iter_labeled_batches(test_dir):
+        if max_images:
+            inputs, labels = inputs[:max_images - images], labels[:max_images - images]
+        prediction = np.asarray(model.predict_on_batch(inputs))
+        correct += int(np.sum(np.argmax(prediction, axis=1) == labels))
+        if images == 0:
+            image = inputs[:1]
+        images += len(labels)
+        if max_images and images >= max_images:
+            break
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict_on_batch(image)
+        latencies.append(1000.0 * (time.perf_counter() - start))
+    batch = np.repeat(image, 32, axis=0)
+    start = time.perf_counter()
+    for _ in range(3):
+        model.predict_on_batch(batch)
+    images_per_second = 3 * len(batch) / (time.perf_counter() - start)
+
+    result = percentiles(latencies)
+    result.update({
+        'model': source,
+        'parameters': int(model.count_params()) if hasattr(model, 'count_params') else None,
+        'size_mb': os.path.getsize(model_files[backend]) / 2**20 if os.path.exists(model_files[backend]) else None,
+        'accuracy': correct / images,
+        'images': images,
+        'load_seconds': load_seconds,
+        'images_per_second_batch32': images_per_second,
+        'model_rss_mb': peak_rss_mb() - before,
+        'peak_rss_mb': peak_rss_mb(),
+    })
+    return result
+
+
+def compare(backends=('keras', 'student'), test_dir='test', max_images=None, repeat=20):
+    report = {}
+    for name in backends:
+        command = [sys.executable, __file__, 'report-child', name, test_dir, str(repeat)]
+        if max_images:
+            command.append(str(max_images))
+        child = subprocess.run(command, check=True, capture_output=True, text=True)
+        report[name] = json.loads(child.stdout.strip().splitlines()[-1])
+    return report
+
+
+def run_fit(args):
+    start = time.perf_counter()
+    # Teacher selalu model asli (diunduh dan diverifikasi jika perlu), tidak pernah model pengganti benchmark
+    teacher, source = load_model_once('keras'), model_files['keras']
+    _, history = distill(teacher, args.train_dir, args.test_dir, args.student, args.alpha,
+                         None if args.student_weights == 'none' else args.student_weights, args.epochs,
+                         args.batch_size, args.learning_rate, args.temperature, args.loss_alpha, args.patience,
+                         args.output)
+    best = int(np.argmax(history.history['val_categorical_accuracy']))
+    print(f"Student ({args.student}, teacher {source}) dilatih dalam {time.perf_counter() - start:.1f} detik, "
+          f"val_accuracy terbaik {history.history['val_categorical_accuracy'][best]:.4f} (epoch {best + 1}), "
+          f"disimpan ke {args.output}")
+
+
+def run_report(args):
+    report = compare(args.backends, args.test_dir, args.max_images, args.repeat)
+    for name, row in report.items():
+        parameters = f"{row['parameters'] / 1e6:.1f}M" if row['parameters'] else '-'
+        print(f"{name:12s} ({row['model']}) akurasi={row['accuracy']:.4f} params={parameters:>6s} "
+              f"p50={row['p50_ms']:7.1f} ms p95={row['p95_ms']:7.1f} ms "
+              f"batch32={row['images_per_second_batch32']:6.1f} gambar/detik memori model={row['model_rss_mb']:.0f} MB")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'distill': report}, f, indent=2)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Distilasi model SiBetta ke student yang lebih kecil')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    fit_parser = subparsers.add_parser('fit', help='latih student dengan model saat ini sebagai teacher')
+    fit_parser.add_argument('--train-dir', default='train')
+    fit_parser.add_argument('--test-dir', default='test')
+    fit_parser.add_argument('--student', choices=['mobilenet', 'vgg-gap'], default='mobilenet')
+    fit_parser.add_argument('--alpha', type=float, default=0.35, help='lebar MobileNetV2 (0.35, 0.5, 0.75, 1.0)')
+    fit_parser.add_argument('--student-weights', default='imagenet', choices=['imagenet', 'none'],
+                            help='bobot awal MobileNetV2')
+    fit_parser.add_argument('--epochs', type=int, default=30)
+    fit_parser.add_argument('--batch-size', type=int, default=32)
+    fit_parser.add_argument('--learning-rate', type=float, default=0.001)
+    fit_parser.add_argument('--temperature', type=float, default=4.0)
+    fit_parser.add_argument('--loss-alpha', type=float, default=0.1,
+                            help='bobot loss label; sisanya untuk loss distilasi')
+    fit_parser.add_argument('--patience', type=int, default=None, help='early stopping pada val_accuracy')
+    fit_parser.add_argument('--output', default=model_files['student'])
+    fit_parser.set_defaults(func=run_fit)
+
+    report_parser = subparsers.add_parser('report', help='akurasi, latensi, dan memori student dibanding teacher')
+    report_parser.add_argument('--backends', nargs='+', default=['keras', 'student'], choices=list(model_files))
+    report_parser.add_argument('--test-dir', default='test')
+    report_parser.add_argument('--max-images', type=int, default=None)
+    report_parser.add_argument('--repeat', type=int, default=20)
+    report_parser.add_argument('--output', help='simpan hasil sebagai JSON')
+    report_parser.set_defaults(func=run_report)
+
+    child_parser = subparsers.add_parser('report-child')
+    child_parser.add_argument('backend', choices=list(model_files))
+    child_parser.add_argument('test_dir')
+    child_parser.add_argument('repeat', type=int)
+    child_parser.add_argument('max_images', type=int, nargs='?')
+    child_parser.set_defaults(func=lambda args: print(json.dumps(
+        _measure_model(args.backend, args.test_dir, args.max_images, args.repeat))))
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    args.func(args)
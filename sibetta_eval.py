@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from sibetta import (backend, class_indices, download_model, load_model_once, model_files, model_sha256,
+                     rescale_batch, verify_model_file)
+from sibetta_bulk import batched, decode_path, iter_image_paths
+from sibetta_cache import PredictionCache, hash_bytes, hash_file
+
+
+# (path, label) dari folder <kelas>/..., dibaca bertahap tanpa menampung seluruh daftar file
+def iter_labeled_paths(root):
+    for path in iter_image_paths(root):
+        class_name = os.path.relpath(path, root).split(os.sep)[0]
+        if class_name in class_indices:
+            yield path, class_indices[class_name]
+
+
+# Sumber evaluasi: (id, label, hash gambar, fungsi decode). Untuk folder biasa hash diambil dari bytes file,
+# untuk folder shard (sibetta_shards.py) dari piksel yang sudah dikemas.
+def iter_samples(root):
+    from sibetta_shards import ShardDataset, is_shard_dir
+
+    if is_shard_dir(root):
+        shards = ShardDataset(root)
+        for i, path in enumerate(shards.paths):
+            img_array, label = shards[i]
+            yield path, label, hash_bytes(img_array.tobytes()), (lambda img_array=img_array: (img_array, None))
+    else:
+        for path, label in iter_labeled_paths(root):
+            relpath = os.path.relpath(path, root).replace(os.sep, '/')
+            yield relpath, label, hash_file(path), (lambda path=path: decode_path(path))
+
+
+# Akurasi, precision/recall/F1 per kelas dari confusion matrix (baris = label, kolom = prediksi)
+def classification_report(confusion):
+    class_labels = {v: k for k, v in class_indices.items()}
+    true_positive = np.diag(confusion)
+    predicted = confusion.sum(axis=0)
+    support = confusion.sum(axis=1)
+    total = int(confusion.sum())
+    per_class = {}
+    for c in range(len(class_labels)):
+        precision = true_positive[c] / predicted[c] if predicted[c] else 0.0
+        recall = true_positive[c] / support[c] if support[c] else 0.0
+        per_class[class_labels[c]] = {
+            'precision': float(precision),
+            'recall': float(recall),
+            'f1': float(2 * precision * recall / (precision + recall)) if precision + recall else 0.0,
+            'support': int(support[c]),
+        }
+    return {
+        'images': total,
+        'accuracy': float(true_positive.sum() / total) if total else 0.0,
+        'per_class': per_class,
+        'confusion_matrix': confusion.tolist(),
+        'labels': [class_labels[c] for c in range(len(class_labels))],
+    }
+
+
+# Evaluasi bertahap: prediksi di-memoize pada (hash model, hash gambar) di cache prediksi,
+# jadi evaluasi ulang hanya menghitung gambar yang baru atau berubah. Hasil per gambar
+# ditulis langsung ke `predictions_file` (JSONL) dan hanya confusion matrix yang disimpan di memori.
+def evaluate(root, backend=backend, batch_size=32, cache_dir='cache', predictions_file=None):
+    if backend == 'keras':
+        download_model()
+    model_hash = verify_model_file(model_files[backend], model_sha256 if backend == 'keras' else None)
+    cache = PredictionCache(model_hash, max_entries=batch_size, cache_dir=cache_dir)
+    class_labels = {v: k for k, v in class_indices.items()}
+    confusion = np.zeros((len(class_indices), len(class_indices)), dtype=np.int64)
+    errors = computed = 0
+    model = None
+    output = open(predictions_file, 'w') if predictions_file else None
+
+    def record(path, label, predicted_class, confidence, cached, error=None):
+        nonlocal errors, computed
+        if error is None:
+            computed += not cached
+            confusion[label, class_indices[predicted_class]] += 1
+            entry = {'path': path, 'label': class_labels[label], 'predicted_class': predicted_class,
+                     'confidence': round(float(confidence), 6), 'cached': cached}
+        else:
+            errors += 1
+            entry = {'path': path, 'label': class_labels[label], 'error': error}
+        if output:
+            output.write(json.dumps(entry) + '\n')
+
+    start = time.perf_counter()
+    processed = 0
+    try:
+        for chunk in batched(iter_samples(root), batch_size):
+            misses = []
+            for path, label, image_hash, decode in chunk:
+                result = cache.get(image_hash)
+                if result is None:
+                    misses.append((path, label, image_hash, decode))
+                else:
+                    record(path, label, *result, cached=True)
+
+            if misses:
+                decoded = [decode() for *_, decode in misses]
+                ok = [i for i, (img_array, _) in enumerate(decoded) if img_array is not None]
+                for i, (_, error) in enumerate(decoded):
+                    if error is not None:
+                        record(misses[i][0], misses[i][1], None, None, cached=False, error=error)
+                if ok:
+                    # Model baru dimuat saat ada gambar yang belum pernah dievaluasi
+                    if model is None:
+                        model = load_model_once(backend)
+                    inputs = rescale_batch(np.stack([decoded[i][0] for i in ok]))
+                    prediction = np.asarray(model.predict_on_batch(inputs))
+                    for i, row in zip(ok, prediction):
+                        path, label, image_hash, _ = misses[i]
+                        c = int(np.argmax(row))
+                        cache.put(image_hash, class_labels[c], row[c])
+                        record(path, label, class_labels[c], row[c], cached=False)
+
+            processed += len(chunk)
+            elapsed = time.perf_counter() - start
+            print(f'\r{processed} gambar ({cache.hits} dari cache, {computed} dihitung, {errors} error), '
+                  f'{processed / elapsed:.1f} gambar/detik', end='', flush=True)
+    finally:
+        if output:
+            output.close()
+    print()
+
+    report = classification_report(confusion)
+    report.update({
+        'root': root,
+        'backend': backend,
+        'model_hash': model_hash,
+        'errors': errors,
+        'cached': cache.hits,
+        'computed': computed,
+        'seconds': time.perf_counter() - start,
+    })
+    return report
+
+
+def print_report(report):
+    print(f"{report['images']} gambar, akurasi {report['accuracy']:.4f} "
+          f"({report['computed']} diprediksi, {report['cached']} dari cache, {report['errors']} error)")
+    print(f"{'kelas':12s} {'precision':>9s} {'recall':>7s} {'f1':>7s} {'jumlah':>7s}")
+    for name, row in report['per_class'].items():
+        print(f"{name:12s} {row['precision']:9.4f} {row['recall']:7.4f} {row['f1']:7.4f} {row['support']:7d}")
+
+    # Confusion matrix: baris = label sebenarnya, kolom = prediksi (nomor kolom = indeks kelas di baris)
+    print('\n' + ' ' * 16 + ' '.join(f'{i:5d}' for i in range(len(report['labels']))))
+    for i, (name, row) in enumerate(zip(report['labels'], report['confusion_matrix'])):
+        print(f'{i:2d} {name:12s} ' + ' '.join(f'{count:5d}' for count in row))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Evaluasi model pada folder <kelas>/*.jpg (misalnya test/)')
+    parser.add_argument('root', nargs='?', default='test', help='folder gambar per kelas atau folder shard')
+    parser.add_argument('--backend', default=backend, choices=list(model_files))
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--cache-dir', default=os.environ.get('SIBETTA_CACHE_DIR', 'cache'),
+                        help='folder cache prediksi (dipakai bersama dengan aplikasi jika SIBETTA_CACHE_DIR sama)')
+    parser.add_argument('--predictions', help='tulis prediksi per gambar ke file JSONL')
+    parser.add_argument('--output', help='simpan ringkasan sebagai JSON')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    report = evaluate(args.root, args.backend, args.batch_size, args.cache_dir, args.predictions)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,471 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+
+EMBEDDING_DIM = 512
+INITIAL_CAPACITY = 1024
+# Indeks dengan minimal PARTITION_MIN_SIZE gambar dipartisi (lihat train_partition); query memeriksa NPROBE partisi
+PARTITION_MIN_SIZE = 20000
+NPROBE = 16
+
+
+# Model embedding: base VGG16 dari model klasifikasi + global average pooling (7x7x512 -> 512).
+# Bobotnya dipakai bersama dengan model klasifikasi, jadi tidak ada model tambahan yang dimuat.
+def build_embedding_model(model):
+    from tensorflow.keras.layers import GlobalAveragePooling2D
+    from tensorflow.keras.models import Sequential
+
+    embedding_model = Sequential([model.layers[0], GlobalAveragePooling2D()])
+    embedding_model.build((None, 224, 224, 3))
+    return embedding_model
+
+# Model gabungan untuk aplikasi: softmax model klasifikasi dan embedding dari satu forward pass
+# melalui base VGG16, jadi gambar yang diklasifikasikan tidak perlu di-decode dan diproses ulang untuk embedding.
+def build_joint_model(model):
+    from tensorflow.keras.layers import GlobalAveragePooling2D, Input
+    from tensorflow.keras.models import Model
+
+    inputs = Input(shape=(224, 224, 3))
+    features = model.layers[0](inputs)
+    x = features
+    for layer in model.layers[1:]:
+        x = layer(x)
+    return Model(inputs, [x, GlobalAveragePooling2D()(features)])
+
+def embed_batch(embedding_model, img_array):
+    return np.asarray(embedding_model.predict_on_batch(img_array), dtype=np.float32)
+
+def normalize(embeddings):
+    embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+# Indeks embedding untuk pencarian gambar termirip dengan cosine similarity.
+#
+# Di disk, embedding (sudah dinormalisasi) disimpan sebagai matriks float16 yang di-memory-map
+# (embeddings.npy) dan tabel id -> path di index.json; id adalah nomor baris. Baris yang dihapus
+# hanya ditandai (path None) sampai compact() dipanggil.
+#
+# Indeks kecil dicari secara menyeluruh: matriks disalin sekali ke float32 di memori sehingga satu
+# query adalah satu perkalian matriks-vektor BLAS ditambah argpartition. Indeks besar dipartisi
+# (partition.npz: centroid k-means dan partisi tiap baris); query hanya membaca baris di partisi
+# terdekat langsung dari memory map, jadi tidak ada salinan float32 seluruh matriks.
+#
+# Satu objek aman dipakai bersama oleh beberapa thread (misalnya sesi Streamlit): add/remove/search/save dikunci.
+class EmbeddingIndex:
+    def __init__(self, index_dir, dim=EMBEDDING_DIM, model_hash=None):
+        self.index_dir = index_dir
+        self.matrix_path = os.path.join(index_dir, 'embeddings.npy')
+        self.table_path = os.path.join(index_dir, 'index.json')
+        self.partition_path = os.path.join(index_dir, 'partition.npz')
+        self._vectors = None
+        self._lists = None
+        self._lock = threading.RLock()
+        self.centroids = None
+        self.assignments = None
+        self.trained_on = 0
+
+        if os.path.exists(self.table_path):
+            with open(self.table_path) as f:
+                table = json.load(f)
+            self.dim = table['dim']
+            self.model_hash = table.get('model_hash')
+            self.paths = table['paths']
+            self.matrix = np.load(self.matrix_path, mmap_mode='r+')
+        else:
+            os.makedirs(index_dir, exist_ok=True)
+            self.dim = dim
+            self.model_hash = model_hash
+            self.paths = []
+            self.matrix = np.lib.format.open_memmap(
+                self.matrix_path, mode='w+', dtype=np.float16, shape=(INITIAL_CAPACITY, dim))
+            self.save()
+        self.ids = {path: i for i, path in enumerate(self.paths) if path is not None}
+
+        if self.paths and os.path.exists(self.partition_path):
+            with np.load(self.partition_path) as partition:
+                # Partisi yang tidak cocok dengan index.json (misalnya penulisan terputus) diabaikan
+                if len(partition['assignments']) == len(self.paths):
+                    self.centroids = partition['centroids']
+                    self.assignments = partition['assignments']
+                    self.trained_on = int(partition['trained_on'])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, path):
+        return path in self.ids
+
+    @property
+    def capacity(self):
+        return self.matrix.shape[0]
+
+    @property
+    def partitioned(self):
+        return self.centroids is not None
+
+    # Siapkan struktur pencarian lebih awal agar query pertama tidak lambat
+    def prepare(self):
+        if self.partitioned:
+            self._load_lists()
+        else:
+            self.load_vectors()
+
+    # Salinan float32 dari baris yang terpakai; baris yang dihapus bernilai nol dan di-mask saat query.
+    # Dipanggil otomatis oleh search(), bisa juga dipanggil lebih awal agar query pertama tidak lambat.
+    def load_vectors(self):
+        with self._lock:
+            if self._vectors is None:
+                count = len(self.paths)
+                self._vectors = np.zeros((self.capacity, self.dim), dtype=np.float32)
+                self._vectors[:count] = self.matrix[:count]
+                self._active = np.zeros(len(self._vectors), dtype=bool)
+                self._active[list(self.ids.values())] = True
+            return self._vectors
+
+    # Kapasitas dilipatgandakan sehingga add() bertahap tetap amortized O(n)
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        count = len(self.paths)
+        self._write_matrix(self.matrix[:count], capacity)
+
+        if self._vectors is not None:
+            vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+            vectors[:count] = self._vectors[:count]
+            active = np.zeros(capacity, dtype=bool)
+            active[:count] = self._active[:count]
+            self._vectors, self._active = vectors, active
+
+    def add(self, paths, embeddings):
+        embeddings = normalize(embeddings)
+        with self._lock:
+            # Path yang sudah ada diganti: baris lama dihapus, embedding baru ditambahkan di akhir
+            self.remove([path for path in paths if path in self.ids], save=False)
+            start = len(self.paths)
+            end = start + len(paths)
+            self._grow(end)
+            self.matrix[start:end] = embeddings
+            self.matrix.flush()
+            if self._vectors is not None:
+                self._vectors[start:end] = embeddings
+                self._active[start:end] = True
+            for i, path in enumerate(paths, start):
+                self.paths.append(path)
+                self.ids[path] = i
+            if self.partitioned:
+                self.assignments = np.concatenate([self.assignments, self._assign(embeddings)])
+                self._lists = None
+            self.save()
+            return list(range(start, end))
+
+    def remove(self, paths, save=True):
+        removed = 0
+        with self._lock:
+            for path in paths:
+                i = self.ids.pop(path, None)
+                if i is None:
+                    continue
+                self.paths[i] = None
+                self.matrix[i] = 0
+                if self._vectors is not None:
+                    self._vectors[i] = 0
+                    self._active[i] = False
+                if self.partitioned:
+                    self.assignments[i] = -1
+                    self._lists = None
+                removed += 1
+            if removed and save:
+                self.matrix.flush()
+                self.save()
+        return removed
+
+    # Batasi jumlah gambar: yang paling lama ditambahkan dihapus lebih dulu. Matriks ditulis ulang
+    # begitu baris yang dihapus lebih banyak dari yang tersisa, jadi file tidak terus membesar.
+    def trim(self, max_entries):
+        with self._lock:
+            excess = len(self.ids) - max_entries
+            if excess > 0:
+                self.remove([path for path in self.paths if path is not None][:excess])
+            if len(self.paths) - len(self.ids) > max(len(self.ids), INITIAL_CAPACITY):
+                self.compact()
+
+    # Partisi kasar (IVF): k-means spherical pada sampel embedding, lalu setiap baris dimasukkan ke partisi
+    # dengan centroid terdekat. Baris yang ditambahkan kemudian langsung dimasukkan ke partisinya.
+    def train_partition(self, nlist=None, iterations=10, sample_size=50000, seed=0):
+        with self._lock:
+            rows = np.array(sorted(self.ids.values()), dtype=np.int64)
+            rng = np.random.default_rng(seed)
+            sample = normalize(self.matrix[np.sort(rng.choice(rows, min(sample_size, len(rows)), replace=False))])
+            nlist = min(nlist or max(1, int(4 * np.sqrt(len(rows)))), len(sample))
+            centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+            for _ in range(iterations):
+                assigned = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assigned, sample)
+                # Partisi yang kosong mempertahankan centroid lamanya
+                empty = np.bincount(assigned, minlength=nlist) == 0
+                sums[empty] = centroids[empty]
+                centroids = normalize(sums)
+
+            self.centroids = centroids
+            self.assignments = np.full(len(self.paths), -1, dtype=np.int32)
+            for start in range(0, len(rows), 8192):
+                block = rows[start:start + 8192]
+                self.assignments[block] = self._assign(self.matrix[block])
+            self.trained_on = len(rows)
+            self._lists = None
+            self.save()
+
+    def _assign(self, embeddings):
+        return np.argmax(normalize(embeddings) @ self.centroids.T, axis=1).astype(np.int32)
+
+    # Baris per partisi: `order` berisi nomor baris yang diurutkan per partisi, partisi c adalah
+    # order[offsets[c]:offsets[c + 1]]. Dibangun ulang setelah add/remove.
+    def _load_lists(self):
+        if self._lists is None:
+            rows = np.nonzero(self.assignments >= 0)[0]
+            order = rows[np.argsort(self.assignments[rows], kind='stable')]
+            counts = np.bincount(self.assignments[rows], minlength=len(self.centroids))
+            self._lists = order, np.concatenate([[0], np.cumsum(counts)])
+        return self._lists
+
+    def _search_partitioned(self, query, k, nprobe):
+        order, offsets = self._load_lists()
+        nprobe = min(nprobe, len(self.centroids))
+        probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        rows = np.sort(np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probe]))
+        if not len(rows):
+            return []
+        scores = self.matrix[rows].astype(np.float32) @ query
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return [(self.paths[rows[i]], float(scores[i])) for i in top[np.argsort(-scores[top])]]
+
+    # Top-k cosine similarity untuk beberapa query sekaligus: list berisi [(path, skor), ...] per query.
+    # Pada indeks berpartisi hanya `nprobe` partisi terdekat yang diperiksa (nprobe >= jumlah partisi = eksak).
+    def search(self, queries, k=5, nprobe=NPROBE):
+        queries = normalize(queries)
+        with self._lock:
+            if not self.ids:
+                return [[] for _ in queries]
+            if self.partitioned:
+                return [self._search_partitioned(query, k, nprobe) for query in queries]
+            vectors = self.load_vectors()
+            count = len(self.paths)
+            scores = queries @ vectors[:count].T
+            if len(self.ids) < count:
+                scores[:, ~self._active[:count]] = -np.inf
+            k = min(k, len(self.ids))
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            results = []
+            for row, candidates in zip(scores, top):
+                candidates = candidates[np.argsort(-row[candidates])]
+                results.append([(self.paths[i], float(row[i])) for i in candidates])
+            return results
+
+    # Pasangan gambar dengan similarity >= threshold, dihitung per blok agar memori tetap kecil
+    def duplicates(self, threshold=0.95, block_size=4096):
+        vectors = self.load_vectors()
+        count = len(self.paths)
+        active = self._active[:count]
+        for start in range(0, count, block_size):
+            scores = vectors[start:start + block_size] @ vectors[:count].T
+            if len(self.ids) < count:
+                scores[:, ~active] = -np.inf
+            for i, j in zip(*np.nonzero(scores >= threshold)):
+                i += start
+                if i < j and active[i]:
+                    yield self.paths[i], self.paths[j], float(scores[i - start, j])
+
+    # Tulis ulang matriks tanpa baris yang sudah dihapus (id berubah)
+    def compact(self):
+        with self._lock:
+            keep = [i for i, path in enumerate(self.paths) if path is not None]
+            self._write_matrix(self.matrix[keep], max(INITIAL_CAPACITY, len(keep)))
+            self.paths = [self.paths[i] for i in keep]
+            self.ids = {path: i for i, path in enumerate(self.paths)}
+            self._vectors = None
+            if self.partitioned:
+                self.assignments = self.assignments[keep]
+                self._lists = None
+            self.save()
+
+    # Matriks baru ditulis ke file sementara (nama unik per proses dan thread) lalu menggantikan yang lama
+    def _write_matrix(self, rows, capacity):
+        tmp_path = f'{self.matrix_path}.{os.getpid()}.{threading.get_ident()}.tmp.npy'
+        matrix = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float16, shape=(capacity, self.dim))
+        matrix[:len(rows)] = rows
+        matrix.flush()
+        del matrix, self.matrix
+        os.replace(tmp_path, self.matrix_path)
+        self.matrix = np.load(self.matrix_path, mmap_mode='r+')
+
+    def save(self):
+        tmp_path = f'{self.table_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with self._lock:
+            with open(tmp_path, 'w') as f:
+                json.dump({'dim': self.dim, 'model_hash': self.model_hash, 'paths': self.paths}, f)
+            os.replace(tmp_path, self.table_path)
+            if self.partitioned:
+                with open(tmp_path, 'wb') as f:
+                    np.savez(f, centroids=self.centroids, assignments=self.assignments, trained_on=self.trained_on)
+                os.replace(tmp_path, self.partition_path)
+
+
+# Partisi dilatih ulang jika indeks sudah cukup besar dan belum dipartisi, atau sudah tumbuh 4x
+# sejak partisi terakhir dilatih (centroid lama tidak lagi mewakili data)
+def maybe_partition(index, min_size=PARTITION_MIN_SIZE):
+    if len(index) >= min_size and (not index.partitioned or len(index) > 4 * index.trained_on):
+        start = time.perf_counter()
+        index.train_partition()
+        print(f'{len(index.centroids)} partisi dilatih dalam {time.perf_counter() - start:.1f} detik')
+        return True
+    return False
+
+
+# Buka indeks hanya jika dibuat dengan model yang sama (embedding dari model lain tidak sebanding)
+def open_index(index_dir, model_hash=None):
+    if not os.path.exists(os.path.join(index_dir, 'index.json')):
+        return None
+    index = EmbeddingIndex(index_dir)
+    if model_hash and index.model_hash and index.model_hash != model_hash:
+        return None
+    return index
+
+
+def _load_keras_model():
+    from sibetta import get_model_loader
+
+    loader = get_model_loader('keras')
+    return loader.wait(), loader.model_hash
+
+# Tambahkan gambar baru dan hapus gambar yang sudah tidak ada, jadi build bisa diulang kapan saja
+def sync_index(index, image_paths, embedding_model, batch_size=32):
+    from sibetta import rescale_batch
+    from sibetta_bulk import batched, decode_path
+
+    existing = set(image_paths)
+    removed = index.remove([path for path in list(index.ids) if path not in existing])
+    new_paths = [path for path in image_paths if path not in index]
+
+    added = 0
+    start = time.perf_counter()
+    for batch_paths in batched(new_paths, batch_size):
+        decoded = [(path, decode_path(path)) for path in batch_paths]
+        ok = [(path, img_array) for path, (img_array, error) in decoded if img_array is not None]
+        for path, (_, error) in decoded:
+            if error is not None:
+                print(f'\n{path}: {error}')
+        if not ok:
+            continue
+        embeddings = embed_batch(embedding_model, rescale_batch(np.stack([img_array for _, img_array in ok])))
+        index.add([path for path, _ in ok], embeddings)
+        added += len(ok)
+        elapsed = time.perf_counter() - start
+        print(f'\r{added}/{len(new_paths)} gambar ditambahkan, {added / elapsed:.1f} gambar/detik', end='', flush=True)
+    if new_paths:
+        print()
+    return added, removed
+
+
+def run_build(args):
+    from sibetta_bulk import iter_image_paths
+
+    model, model_hash = _load_keras_model()
+    index = open_index(args.index_dir, model_hash)
+    if index is None:
+        if os.path.exists(os.path.join(args.index_dir, 'index.json')):
+            print(f'{args.index_dir} dibuat dengan model lain, indeks dibangun ulang')
+            for name in ('index.json', 'partition.npz'):
+                if os.path.exists(os.path.join(args.index_dir, name)):
+                    os.remove(os.path.join(args.index_dir, name))
+        index = EmbeddingIndex(args.index_dir, model_hash=model_hash)
+    image_paths = [path.replace(os.sep, '/') for path in iter_image_paths(args.train_dir)]
+    added, removed = sync_index(index, image_paths, build_embedding_model(model), args.batch_size)
+    maybe_partition(index)
+    print(f'{args.index_dir}: {len(index)} gambar ({added} ditambahkan, {removed} dihapus)')
+
+
+def run_partition(args):
+    index = EmbeddingIndex(args.index_dir)
+    start = time.perf_counter()
+    index.train_partition(args.lists)
+    print(f'{len(index)} gambar dalam {len(index.centroids)} partisi ({time.perf_counter() - start:.1f} detik)')
+
+
+def run_remove(args):
+    index = EmbeddingIndex(args.index_dir)
+    removed = index.remove(args.paths)
+    if args.compact:
+        index.compact()
+    print(f'{removed} gambar dihapus, {len(index)} tersisa')
+
+
+def run_query(args):
+    from sibetta import load_and_preprocess_images
+
+    model, model_hash = _load_keras_model()
+    index = open_index(args.index_dir, model_hash)
+    if index is None:
+        raise SystemExit(f'Indeks {args.index_dir} belum ada atau dibuat dengan model lain, jalankan build dulu')
+    embeddings = embed_batch(build_embedding_model(model), load_and_preprocess_images(args.images))
+    start = time.perf_counter()
+    results = index.search(embeddings, args.k, args.nprobe)
+    print(f'{len(args.images)} query dalam {1000.0 * (time.perf_counter() - start):.1f} ms')
+    for image, matches in zip(args.images, results):
+        print(image)
+        for path, score in matches:
+            print(f'  {score:.4f}  {path}')
+
+
+def run_duplicates(args):
+    index = EmbeddingIndex(args.index_dir)
+    for path_a, path_b, score in index.duplicates(args.threshold):
+        print(f'{score:.4f}  {path_a}  {path_b}')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Indeks embedding gambar referensi SiBetta')
+    parser.add_argument('--index-dir', default=os.environ.get('SIBETTA_INDEX_DIR', 'index'))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='tambahkan gambar baru dari train/ dan hapus yang sudah tidak ada')
+    build_parser.add_argument('--train-dir', default='train')
+    build_parser.add_argument('--batch-size', type=int, default=32)
+    build_parser.set_defaults(func=run_build)
+
+    remove_parser = subparsers.add_parser('remove', help='hapus gambar dari indeks')
+    remove_parser.add_argument('paths', nargs='+')
+    remove_parser.add_argument('--compact', action='store_true', help='tulis ulang matriks tanpa baris yang dihapus')
+    remove_parser.set_defaults(func=run_remove)
+
+    query_parser = subparsers.add_parser('query', help='cari gambar referensi termirip')
+    query_parser.add_argument('images', nargs='+')
+    query_parser.add_argument('-k', type=int, default=5)
+    query_parser.add_argument('--nprobe', type=int, default=NPROBE, help='jumlah partisi yang diperiksa')
+    query_parser.set_defaults(func=run_query)
+
+    partition_parser = subparsers.add_parser(
+        'partition', help=f'latih ulang partisi (otomatis saat build untuk indeks >= {PARTITION_MIN_SIZE} gambar)')
+    partition_parser.add_argument('--lists', type=int, default=None, help='jumlah partisi (default 4 x akar jumlah gambar)')
+    partition_parser.set_defaults(func=run_partition)
+
+    duplicates_parser = subparsers.add_parser('duplicates', help='daftar pasangan gambar yang hampir sama')
+    duplicates_parser.add_argument('--threshold', type=float, default=0.95)
+    duplicates_parser.set_defaults(func=run_duplicates)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    args.func(args)
@@ -0,0 +1,179 @@
+import bisect
+import cProfile
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Batas bucket histogram latensi (detik)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+# Metrik dasar ala Prometheus. Setiap kombinasi label disimpan sebagai tuple terurut.
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(labels)} {value}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            for labels, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{self.name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(labels)} {total}')
+                lines.append(f'{self.name}_count{_format_labels(labels)} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    # Format teks Prometheus (text/plain; version=0.0.4)
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+stage_latency = registry.register(Histogram(
+    'sibetta_stage_latency_seconds', 'Latency of the inference hot path by stage (decode, preprocess, predict, embed).'))
+predictions = registry.register(Counter(
+    'sibetta_predictions_total', 'Predictions returned, by predicted class.'))
+errors = registry.register(Counter(
+    'sibetta_errors_total', 'Errors in the inference path, by stage and exception type.'))
+model_load_seconds = registry.register(Gauge(
+    'sibetta_model_load_seconds', 'Duration of each model loading step (download, verify, load, warmup).'))
+model_time_to_ready = registry.register(Gauge(
+    'sibetta_model_time_to_ready_seconds', 'Seconds from process start until the model was ready.'))
+
+
+# Catat exception ke sibetta_errors_total sekali saja: exception yang sudah dicatat di tahap
+# yang lebih dalam (misalnya decode) tidak dihitung lagi oleh handler di atasnya
+def count_error(stage, e):
+    if not getattr(e, 'sibetta_counted', False):
+        errors.inc(stage=stage, type=type(e).__name__)
+        e.sibetta_counted = True
+
+# Catat latensi satu tahap; exception dicatat ke sibetta_errors_total lalu diteruskan
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        count_error(stage, e)
+        raise
+    finally:
+        stage_latency.observe(time.perf_counter() - start, stage=stage)
+
+
+# Profil cProfile untuk sebagian kecil request (SIBETTA_PROFILE_RATE, misalnya 0.01 = 1%).
+# Hasilnya ditulis sebagai file .prof di SIBETTA_PROFILE_DIR, bisa dibuka dengan snakeviz/pstats.
+profile_rate = float(os.environ.get('SIBETTA_PROFILE_RATE', 0))
+profile_dir = os.environ.get('SIBETTA_PROFILE_DIR', 'profiles')
+
+@contextmanager
+def maybe_profile(name='request'):
+    if profile_rate <= 0 or random.random() >= profile_rate:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(profile_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(
+            profile_dir, f'{name}-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{threading.get_ident()}.prof'))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Endpoint scrape /metrics di thread terpisah (dipakai oleh aplikasi Streamlit)
+def start_http_server(port, host='0.0.0.0'):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='sibetta-metrics', daemon=True).start()
+    return server
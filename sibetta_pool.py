@@ -0,0 +1,98 @@
+import multiprocessing
+import os
+import queue
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from sibetta import backend, download_model, load_model_once, model_files
+
+
+# Jumlah thread TensorFlow untuk proses ini. Harus dipanggil sebelum TensorFlow menjalankan operasi apa pun.
+def configure_tf_threads(intra_op, inter_op):
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+
+# Core CPU untuk replika ke-`slot`: blok berurutan sebanyak `threads` core, berputar jika core habis
+def replica_cpus(slot, threads):
+    cpus = sorted(os.sched_getaffinity(0))
+    start = slot * threads
+    return [cpus[(start + i) % len(cpus)] for i in range(min(threads, len(cpus)))]
+
+
+_replica_model = None
+
+def _init_replica(slots, backend, threads, pin):
+    global _replica_model
+    with slots.get_lock():
+        slot = slots.value
+        slots.value += 1
+    if pin and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, replica_cpus(slot, threads))
+    if not backend.startswith('tflite'):
+        configure_tf_threads(threads, 1)
+    _replica_model = load_model_once(backend, num_threads=threads)
+
+def _predict_replica(inputs):
+    return np.asarray(_replica_model.predict_on_batch(inputs))
+
+
+# Replika model di proses terpisah, masing-masing dengan `threads` thread intra-op (dan satu inter-op),
+# opsional dikunci ke core CPU sendiri agar replika tidak berebut core dan cache.
+# predict_on_batch bersifat blocking dan thread-safe; panggilan bersamaan dibagi ke replika yang kosong.
+class ProcessReplicaPool:
+    def __init__(self, replicas, threads=1, backend=backend, pin=True):
+        self.replicas = replicas
+        self.threads = threads
+        self.mode = 'process'
+        if backend == 'keras':
+            # Unduh sekali di sini agar replika tidak mengunduh bersamaan
+            download_model()
+        # spawn, bukan fork: tiap replika memulai TensorFlow dari awal dengan pengaturan thread-nya sendiri
+        context = multiprocessing.get_context('spawn')
+        self.executor = ProcessPoolExecutor(
+            replicas, mp_context=context, initializer=_init_replica,
+            initargs=(context.Value('i', 0), backend, threads, pin))
+        # Jalankan satu batch per replika sekaligus agar semua proses dibuat dan model dimuat sebelum melayani
+        warmup = np.zeros((1, 224, 224, 3), dtype=np.float32)
+        for future in [self.executor.submit(_predict_replica, warmup) for _ in range(replicas)]:
+            future.result()
+
+    def predict_on_batch(self, inputs):
+        return self.executor.submit(_predict_replica, inputs).result()
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+# Replika di satu proses. Model Keras dipakai bersama oleh semua thread (TensorFlow menjalankan
+# `replicas` operasi bersamaan, masing-masing dengan `threads` thread); interpreter TFLite tidak
+# thread-safe sehingga setiap replika memakai interpreter sendiri.
+class ThreadReplicaPool:
+    def __init__(self, replicas, threads=None, backend=backend):
+        self.replicas = replicas
+        self.threads = threads
+        self.mode = 'thread'
+        if threads and not backend.startswith('tflite'):
+            configure_tf_threads(threads, replicas)
+        model = load_model_once(backend, num_threads=threads)
+        self.models = queue.Queue()
+        self.models.put(model)
+        for _ in range(replicas - 1):
+            if backend.startswith('tflite'):
+                from sibetta_tflite import TFLiteModel
+                self.models.put(TFLiteModel(model_files[backend], threads))
+            else:
+                self.models.put(model)
+
+    def predict_on_batch(self, inputs):
+        model = self.models.get()
+        try:
+            return np.asarray(model.predict_on_batch(inputs))
+        finally:
+            self.models.put(model)
+
+    def shutdown(self):
+        pass
@@ -0,0 +1,252 @@
+import argparse
+import asyncio
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import sibetta_metrics as metrics
+from sibetta import class_indices, load_and_preprocess_image
+from sibetta_pool import ProcessReplicaPool, ThreadReplicaPool
+
+
+MAX_BODY_SIZE = 20 * 1024 * 1024
+
+STATUS_TEXT = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+}
+
+
+# Menggabungkan permintaan yang datang bersamaan menjadi satu batch.
+# Batch dikirim ke model begitu berisi max_batch_size gambar atau setelah
+# menunggu max_wait_ms sejak gambar pertama masuk antrian. Paling banyak
+# `concurrency` batch diproses bersamaan (satu per replika model).
+class MicroBatcher:
+    def __init__(self, model, max_batch_size=16, max_wait_ms=5.0, concurrency=1):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='sibetta-predict')
+        self.slots = asyncio.Semaphore(concurrency)
+        self.running = set()
+        self.batches = 0
+        self.images = 0
+
+    async def predict(self, img_array):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((img_array, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _predict(self, inputs):
+        with metrics.maybe_profile('predict'), metrics.timed('predict'):
+            return np.asarray(self.model.predict_on_batch(inputs))
+
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        inputs = np.concatenate([img_array for img_array, _ in batch])
+        try:
+            prediction = await loop.run_in_executor(self.executor, self._predict, inputs)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.slots.release()
+
+        self.batches += 1
+        self.images += len(batch)
+        for (_, future), probabilities in zip(batch, prediction):
+            if not future.done():
+                future.set_result(probabilities)
+
+    async def run(self):
+        while True:
+            # Tunggu replika kosong dulu, sementara itu permintaan baru menumpuk menjadi batch yang lebih besar
+            await self.slots.acquire()
+            batch = await self._collect()
+            task = asyncio.create_task(self._run_batch(batch))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+
+class InferenceServer:
+    def __init__(self, model, max_batch_size=16, max_wait_ms=5.0, decode_workers=4):
+        self.batcher = MicroBatcher(model, max_batch_size, max_wait_ms, getattr(model, 'replicas', 1))
+        self.decode_executor = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix='sibetta-decode')
+        self.class_labels = {v: k for k, v in class_indices.items()}
+        self.requests = 0
+        self.errors = 0
+
+    def _decode(self, body):
+        with metrics.maybe_profile('decode'):
+            return load_and_preprocess_image(io.BytesIO(body))
+
+    async def predict(self, body):
+        loop = asyncio.get_running_loop()
+        img_array = await loop.run_in_executor(self.decode_executor, self._decode, body)
+        probabilities = await self.batcher.predict(img_array)
+        predicted_class = int(np.argmax(probabilities))
+        metrics.predictions.inc(**{'class': self.class_labels[predicted_class]})
+        return {
+            'predicted_class': self.class_labels[predicted_class],
+            'confidence': float(probabilities[predicted_class]),
+        }
+
+    def stats(self):
+        batches = self.batcher.batches
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'batches': batches,
+            'images': self.batcher.images,
+            'mean_batch_size': self.batcher.images / batches if batches else 0.0,
+            'queue_size': self.batcher.queue.qsize(),
+            'replicas': getattr(self.batcher.model, 'replicas', 1),
+        }
+
+    async def dispatch(self, method, path, body):
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/stats':
+            return 200, self.stats()
+        if path == '/metrics':
+            return 200, metrics.registry.render()
+        if path != '/predict':
+            return 404, {'error': 'not found'}
+        if method != 'POST':
+            return 405, {'error': 'use POST with the image bytes as the request body'}
+
+        self.requests += 1
+        try:
+            return 200, await self.predict(body)
+        except (OSError, ValueError) as e:
+            self.errors += 1
+            metrics.count_error('request', e)
+            return 400, {'error': f'invalid image: {e}'}
+        except Exception as e:
+            self.errors += 1
+            metrics.count_error('request', e)
+            return 500, {'error': f'{type(e).__name__}: {e}'}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                path = path.split('?', 1)[0]
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_SIZE:
+                    await self._respond(writer, 413, {'error': 'image too large'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length)
+
+                status, payload = await self.dispatch(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive=True):
+        # Payload string (misalnya /metrics) dikirim sebagai teks, selain itu JSON
+        if isinstance(payload, str):
+            body = payload.encode()
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body = json.dumps(payload).encode()
+            content_type = 'application/json'
+        head = (
+            f'HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n'
+            '\r\n'
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+async def serve(args):
+    start = time.perf_counter()
+    if args.replica_mode == 'process':
+        model = ProcessReplicaPool(args.replicas, args.threads_per_replica or 1, pin=args.pin_cpus)
+    else:
+        model = ThreadReplicaPool(args.replicas, args.threads_per_replica)
+    print(f'{args.replicas} replika model ({args.replica_mode}, {args.threads_per_replica or "default"} thread/replika) '
+          f'dimuat dalam {time.perf_counter() - start:.1f} detik')
+
+    app = InferenceServer(model, args.max_batch_size, args.max_wait_ms, args.decode_workers)
+    batcher_task = asyncio.create_task(app.batcher.run())
+    server = await asyncio.start_server(app.handle, args.host, args.port)
+    print(f'SiBetta inference server berjalan di http://{args.host}:{args.port} '
+          f'(max_batch_size={args.max_batch_size}, max_wait_ms={args.max_wait_ms})')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batcher_task.cancel()
+        model.shutdown()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='HTTP inference server SiBetta dengan dynamic micro-batching')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch-size', type=int, default=16,
+                        help='jumlah gambar maksimum per pemanggilan model')
+    parser.add_argument('--max-wait-ms', type=float, default=5.0,
+                        help='waktu tunggu maksimum untuk mengisi batch')
+    parser.add_argument('--decode-workers', type=int, default=4,
+                        help='jumlah thread untuk decode dan preprocessing gambar')
+    parser.add_argument('--replicas', type=int, default=1, help='jumlah replika model yang melayani batch bersamaan')
+    parser.add_argument('--replica-mode', choices=['thread', 'process'], default='thread',
+                        help='replika sebagai thread dalam satu proses atau sebagai proses terpisah')
+    parser.add_argument('--threads-per-replica', type=int, default=None,
+                        help='thread intra-op TensorFlow (atau thread TFLite) per replika (default: bawaan TensorFlow)')
+    parser.add_argument('--pin-cpus', action='store_true',
+                        help='kunci setiap replika proses ke core CPU sendiri')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from sibetta import class_indices, decode_image, load_and_preprocess_images, rescale_batch
+from sibetta_bulk import list_images
+from sibetta_cache import hash_file
+
+
+# Sama dengan sibetta_data.TARGET_SIZE; modul ini tidak mengimpor sibetta_data agar tetap bisa dipakai tanpa TensorFlow
+TARGET_SIZE = (224, 224)
+INDEX_FILE = 'index.json'
+SHARD_SIZE = 1024
+RESAMPLE = {'nearest': Image.NEAREST, 'bicubic': Image.BICUBIC}
+
+
+def is_shard_dir(directory):
+    return os.path.exists(os.path.join(directory, INDEX_FILE))
+
+
+# Verifikasi dan decode satu gambar sumber. Mengembalikan (array uint8, mode asli, error);
+# gambar rusak (tidak bisa dibuka, header salah, atau terpotong) menghasilkan error.
+def load_source(path, resample='nearest', target_size=TARGET_SIZE):
+    try:
+        with Image.open(path) as img:
+            mode = img.mode
+            img.verify()
+        # Path diteruskan langsung agar decode_image bisa memakai draft; file terpotong tetap gagal saat decode
+        return decode_image(path, target_size, RESAMPLE[resample]), mode, None
+    except Exception as e:
+        return None, None, f'{type(e).__name__}: {e}'
+
+def _load_item(args):
+    return load_source(*args)
+
+
+# Kemas folder <kelas>/*.jpg menjadi shard uint8 (N, 224, 224, 3) berukuran tetap, labels.npy, dan index.json.
+# Gambar rusak selalu dilewati; gambar non-RGB (grayscale, CMYK, palet, RGBA) dikonversi ke RGB,
+# atau dilewati jika non_rgb='skip'. Semuanya dicatat di index.json.
+def pack(image_dir, shard_dir, shard_size=SHARD_SIZE, resample='nearest', non_rgb='convert', workers=None):
+    items = list_images(image_dir)
+    os.makedirs(shard_dir, exist_ok=True)
+    paths, labels, shards, skipped, converted = [], [], [], [], []
+    shard = None
+
+    def close_shard():
+        shard.flush()
+        count = len(paths) - len(shards) * shard_size
+        file_name = f'shard-{len(shards):05d}.npy'
+        if count < shard_size:
+            # Shard terakhir dipotong ke jumlah gambar sebenarnya
+            full = np.load(os.path.join(shard_dir, file_name), mmap_mode='r')[:count]
+            np.save(os.path.join(shard_dir, file_name + '.tmp.npy'), full)
+            del full
+            os.replace(os.path.join(shard_dir, file_name + '.tmp.npy'), os.path.join(shard_dir, file_name))
+        shards.append({'file': file_name, 'count': count, 'sha256': hash_file(os.path.join(shard_dir, file_name))})
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        sources = pool.map(_load_item, [(path, resample) for path, _ in items], chunksize=16)
+        for (path, label), (img_array, mode, error) in zip(items, sources):
+            relpath = os.path.relpath(path, image_dir).replace(os.sep, '/')
+            if error is not None:
+                skipped.append({'path': relpath, 'error': error})
+                continue
+            if mode != 'RGB':
+                if non_rgb == 'skip':
+                    skipped.append({'path': relpath, 'error': f'mode {mode}, bukan RGB'})
+                    continue
+                converted.append({'path': relpath, 'mode': mode})
+
+            position = len(paths) % shard_size
+            if position == 0:
+                if shard is not None:
+                    close_shard()
+                shard = np.lib.format.open_memmap(
+                    os.path.join(shard_dir, f'shard-{len(shards):05d}.npy'), mode='w+', dtype=np.uint8,
+                    shape=(shard_size,) + TARGET_SIZE + (3,))
+            shard[position] = img_array
+            paths.append(relpath)
+            labels.append(label)
+            print(f'\r{len(paths)}/{len(items)} gambar dikemas', end='', flush=True)
+    if shard is not None:
+        close_shard()
+        del shard
+    print()
+
+    np.save(os.path.join(shard_dir, 'labels.npy'), np.asarray(labels, dtype=np.int64))
+    index = {
+        'source_dir': image_dir,
+        'image_shape': list(TARGET_SIZE + (3,)),
+        'shard_size': shard_size,
+        'resample': resample,
+        'class_indices': class_indices,
+        'count': len(paths),
+        'shards': shards,
+        'labels_sha256': hash_file(os.path.join(shard_dir, 'labels.npy')),
+        'paths': paths,
+        'skipped': skipped,
+        'converted': converted,
+    }
+    with open(os.path.join(shard_dir, INDEX_FILE), 'w') as f:
+        json.dump(index, f, indent=2)
+    print(f'{shard_dir}: {len(paths)} gambar dalam {len(shards)} shard ({time.perf_counter() - start:.1f} detik), '
+          f'{len(skipped)} dilewati, {len(converted)} dikonversi ke RGB')
+    return index
+
+
+# Dataset hasil pack(): shard dibuka dengan memory map (tanpa salinan) dan bisa dibaca acak per indeks
+class ShardDataset:
+    def __init__(self, shard_dir):
+        self.shard_dir = shard_dir
+        with open(os.path.join(shard_dir, INDEX_FILE)) as f:
+            self.index = json.load(f)
+        self.shard_size = self.index['shard_size']
+        self.paths = self.index['paths']
+        self.shards = [np.load(os.path.join(shard_dir, shard['file']), mmap_mode='r')
+                       for shard in self.index['shards']]
+        self.labels = np.load(os.path.join(shard_dir, 'labels.npy'), mmap_mode='r')
+
+    def __len__(self):
+        return len(self.labels)
+
+    # Satu gambar sebagai view uint8 (224, 224, 3) ke dalam memmap, beserta labelnya
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.shards[i // self.shard_size][i % self.shard_size], int(self.labels[i])
+
+    # Beberapa gambar sekaligus dalam satu array uint8 (N, 224, 224, 3), urutan mengikuti `indices`
+    def take(self, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        images = np.empty((len(indices),) + tuple(self.index['image_shape']), dtype=np.uint8)
+        shard_ids = indices // self.shard_size
+        for shard_id in np.unique(shard_ids):
+            selected = np.nonzero(shard_ids == shard_id)[0]
+            # Offset diurutkan agar memmap dibaca berurutan
+            order = np.argsort(indices[selected])
+            images[selected[order]] = self.shards[shard_id][np.sort(indices[selected] % self.shard_size)]
+        return images, np.asarray(self.labels[indices])
+
+    # Batch berurutan (uint8, label), misalnya untuk evaluasi
+    def batches(self, batch_size=32):
+        for start in range(0, len(self), batch_size):
+            yield self.take(np.arange(start, min(start + batch_size, len(self))))
+
+    # Cek shard terhadap index.json: jumlah, bentuk, dtype, checksum, dan label
+    def verify(self):
+        problems = []
+        for shard, array in zip(self.index['shards'], self.shards):
+            if array.shape != (shard['count'],) + tuple(self.index['image_shape']) or array.dtype != np.uint8:
+                problems.append(f"{shard['file']}: bentuk {array.shape} {array.dtype} tidak sesuai")
+            elif hash_file(os.path.join(self.shard_dir, shard['file'])) != shard['sha256']:
+                problems.append(f"{shard['file']}: checksum tidak sesuai")
+        if hash_file(os.path.join(self.shard_dir, 'labels.npy')) != self.index.get('labels_sha256'):
+            problems.append('labels.npy: checksum tidak sesuai')
+        if len(self.labels) != self.index['count'] or len(self.paths) != self.index['count']:
+            problems.append(f"jumlah label/path tidak sama dengan count {self.index['count']}")
+        elif len(self.labels) and not 0 <= int(np.min(self.labels)) <= int(np.max(self.labels)) < len(class_indices):
+            problems.append('label di luar rentang kelas')
+        return problems
+
+
+# Batch evaluasi (float32 [0, 1], label) dari folder shard atau dari folder <kelas>/*.jpg
+def iter_labeled_batches(directory, batch_size=32):
+    if is_shard_dir(directory):
+        for images, labels in ShardDataset(directory).batches(batch_size):
+            yield rescale_batch(images), labels
+        return
+    items = list_images(directory)
+    for start in range(0, len(items), batch_size):
+        chunk = items[start:start + batch_size]
+        yield load_and_preprocess_images([path for path, _ in chunk]), np.array([label for _, label in chunk])
+
+
+def run_pack(args):
+    pack(args.image_dir, args.output, args.shard_size, args.resample, args.non_rgb, args.workers)
+
+
+def run_verify(args):
+    dataset = ShardDataset(args.shard_dir)
+    problems = dataset.verify()
+    for problem in problems:
+        print(problem)
+    for entry in dataset.index['skipped']:
+        print(f"dilewati saat pack: {entry['path']} ({entry['error']})")
+    for entry in dataset.index['converted']:
+        print(f"dikonversi ke RGB saat pack: {entry['path']} (mode {entry['mode']})")
+    print(f"{args.shard_dir}: {len(dataset)} gambar, {len(dataset.shards)} shard, "
+          f"{'OK' if not problems else f'{len(problems)} masalah'}")
+    if problems:
+        raise SystemExit(1)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Kemas dataset gambar menjadi shard uint8 ter-memory-map')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pack_parser = subparsers.add_parser('pack', help='kemas folder <kelas>/*.jpg menjadi shard')
+    pack_parser.add_argument('image_dir', help='misalnya train atau test')
+    pack_parser.add_argument('-o', '--output', required=True, help='folder shard, misalnya shards/train')
+    pack_parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help='jumlah gambar per shard')
+    pack_parser.add_argument('--resample', choices=list(RESAMPLE), default='nearest',
+                             help="interpolasi resize: 'nearest' seperti pipeline pelatihan, 'bicubic' seperti aplikasi")
+    pack_parser.add_argument('--non-rgb', choices=['convert', 'skip'], default='convert',
+                             help='gambar grayscale/CMYK/palet/RGBA dikonversi ke RGB atau dilewati')
+    pack_parser.add_argument('--workers', type=int, default=None)
+    pack_parser.set_defaults(func=run_pack)
+
+    verify_parser = subparsers.add_parser('verify', help='cek integritas shard dan tampilkan gambar yang bermasalah')
+    verify_parser.add_argument('shard_dir')
+    verify_parser.set_defaults(func=run_verify)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    args.func(args)
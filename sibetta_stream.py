@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import time
+from collections import Counter
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+ANIMATION_EXTENSIONS = ('.gif', '.webp')
+
+
+# dHash 64 bit: gambar grayscale 9x8, setiap bit menyatakan apakah piksel lebih terang dari tetangga kanannya.
+# Frame yang hampir sama (noise sensor, kompresi) hanya berbeda beberapa bit.
+def dhash(img, hash_size=8):
+    gray = img.convert('L').resize((hash_size + 1, hash_size), Image.BOX)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+# Frame (detik, PIL.Image RGB) dari file video (OpenCV), GIF/WebP animasi, atau folder berisi gambar frame
+def iter_video_frames(path, fps=None):
+    if os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path) if name.lower().endswith(('.jpg', '.jpeg', '.png')))
+        for i, name in enumerate(names):
+            with Image.open(os.path.join(path, name)) as img:
+                yield i / (fps or 30.0), img.convert('RGB')
+    elif path.lower().endswith(ANIMATION_EXTENSIONS):
+        with Image.open(path) as img:
+            timestamp = 0.0
+            for frame in ImageSequence.Iterator(img):
+                yield timestamp, frame.convert('RGB')
+                timestamp += frame.info.get('duration', 1000.0 / (fps or 10.0)) / 1000.0
+    else:
+        try:
+            import cv2
+        except ImportError:
+            raise ImportError('membaca file video membutuhkan opencv-python-headless (pip install opencv-python-headless)')
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            raise OSError(f'video tidak bisa dibuka: {path}')
+        fps = fps or capture.get(cv2.CAP_PROP_FPS) or 30.0
+        try:
+            i = 0
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield i / fps, Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                i += 1
+        finally:
+            capture.release()
+
+
+# Klasifikasi aliran frame dengan biaya CPU terbatas:
+#   1. frame yang dHash-nya hampir sama dengan frame terakhir yang dinilai dilewati,
+#   2. paling banyak max_inferred_fps frame per detik (waktu video/kamera) yang dinilai,
+#   3. frame yang dinilai dikumpulkan menjadi batch (maksimal batch_size, atau max_delay detik),
+#   4. probabilitas dihaluskan dengan exponential moving average agar label tidak berkedip.
+# `preprocess` mengubah list PIL.Image menjadi batch float32, misalnya sibetta.load_and_preprocess_images.
+class StreamClassifier:
+    def __init__(self, model, preprocess, class_indices, batch_size=8, hash_threshold=5,
+                 max_inferred_fps=5.0, max_delay=0.5, smoothing=0.3):
+        self.model = model
+        self.preprocess = preprocess
+        self.class_labels = {v: k for k, v in class_indices.items()}
+        self.batch_size = batch_size
+        self.hash_threshold = hash_threshold
+        self.min_interval = 1.0 / max_inferred_fps if max_inferred_fps else 0.0
+        self.max_delay = max_delay
+        self.smoothing = smoothing
+
+        self.pending = []
+        self.last_hash = None
+        self.last_scored = None
+        self.probabilities = None
+        self.frames = 0
+        self.inferred = 0
+        self.skipped_duplicate = 0
+        self.skipped_rate = 0
+        self.batches = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.processing_seconds = 0.0
+        self.label_seconds = Counter()
+
+    # Label hasil penghalusan saat ini: (label, probabilitas), atau (None, None) sebelum ada frame yang dinilai
+    @property
+    def label(self):
+        if self.probabilities is None:
+            return None, None
+        c = int(np.argmax(self.probabilities))
+        return self.class_labels[c], float(self.probabilities[c])
+
+    def feed(self, frame, timestamp):
+        start = time.perf_counter()
+        self.frames += 1
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        elif self.label[0] is not None:
+            self.label_seconds[self.label[0]] += timestamp - self.last_timestamp
+        self.last_timestamp = timestamp
+
+        frame_hash = dhash(frame)
+        if self.last_hash is not None and hamming(frame_hash, self.last_hash) <= self.hash_threshold:
+            self.skipped_duplicate += 1
+        elif self.last_scored is not None and timestamp - self.last_scored < self.min_interval:
+            self.skipped_rate += 1
+        else:
+            self.last_hash = frame_hash
+            self.last_scored = timestamp
+            self.pending.append((timestamp, frame))
+
+        if self.pending and (len(self.pending) >= self.batch_size
+                             or timestamp - self.pending[0][0] >= self.max_delay):
+            self._score()
+        self.processing_seconds += time.perf_counter() - start
+        return self.label
+
+    def flush(self):
+        start = time.perf_counter()
+        if self.pending:
+            self._score()
+        self.processing_seconds += time.perf_counter() - start
+        return self.label
+
+    def _score(self):
+        inputs = self.preprocess([frame for _, frame in self.pending])
+        prediction = np.asarray(self.model.predict_on_batch(inputs))
+        for row in prediction:
+            if self.probabilities is None:
+                self.probabilities = row
+            else:
+                self.probabilities = self.smoothing * row + (1 - self.smoothing) * self.probabilities
+        self.inferred += len(self.pending)
+        self.batches += 1
+        self.pending = []
+
+    def stats(self):
+        duration = (self.last_timestamp - self.first_timestamp) if self.frames else 0.0
+        label, confidence = self.label
+        return {
+            'frames': self.frames,
+            'inferred': self.inferred,
+            'inferred_fraction': self.inferred / self.frames if self.frames else 0.0,
+            'skipped_duplicate': self.skipped_duplicate,
+            'skipped_rate': self.skipped_rate,
+            'batches': self.batches,
+            'mean_batch_size': self.inferred / self.batches if self.batches else 0.0,
+            'stream_seconds': duration,
+            'processing_seconds': self.processing_seconds,
+            'effective_fps': self.frames / self.processing_seconds if self.processing_seconds else 0.0,
+            'label': label,
+            'confidence': confidence,
+            # Label dengan durasi terlama di sepanjang video
+            'dominant_label': self.label_seconds.most_common(1)[0][0] if self.label_seconds else label,
+        }
+
+
+def classify_video(path, model, preprocess, class_indices, timeline=None, fps=None, **options):
+    stream = StreamClassifier(model, preprocess, class_indices, **options)
+    previous = None
+    for timestamp, frame in iter_video_frames(path, fps):
+        label, confidence = stream.feed(frame, timestamp)
+        if timeline is not None and label != previous:
+            timeline.write(json.dumps({'time': round(timestamp, 3), 'label': label,
+                                       'confidence': round(confidence, 6)}) + '\n')
+            previous = label
+    stream.flush()
+    return stream.stats()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Klasifikasi video (rekaman kamera akuarium) frame demi frame')
+    parser.add_argument('video', help='file video (.mp4, .avi, ...), GIF/WebP animasi, atau folder berisi frame')
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--hash-threshold', type=int, default=5,
+                        help='jarak Hamming dHash maksimum agar frame dianggap sama dengan frame terakhir yang dinilai')
+    parser.add_argument('--max-inferred-fps', type=float, default=5.0,
+                        help='batas frame yang dinilai per detik video (0 = tanpa batas)')
+    parser.add_argument('--max-delay', type=float, default=0.5, help='waktu tunggu maksimum untuk mengisi batch (detik)')
+    parser.add_argument('--smoothing', type=float, default=0.3, help='bobot frame terbaru pada moving average')
+    parser.add_argument('--fps', type=float, default=None, help='fps jika tidak tercatat di file')
+    parser.add_argument('--timeline', help='tulis perubahan label ke file JSONL')
+    parser.add_argument('--output', help='simpan statistik sebagai JSON')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    from sibetta import class_indices, load_and_preprocess_images, load_model_once
+
+    model = load_model_once()
+    timeline = open(args.timeline, 'w') if args.timeline else None
+    try:
+        stats = classify_video(args.video, model, load_and_preprocess_images, class_indices, timeline, args.fps,
+                               batch_size=args.batch_size, hash_threshold=args.hash_threshold,
+                               max_inferred_fps=args.max_inferred_fps, max_delay=args.max_delay,
+                               smoothing=args.smoothing)
+    finally:
+        if timeline:
+            timeline.close()
+    print(f"{stats['frames']} frame ({stats['stream_seconds']:.1f} detik video) diproses dalam "
+          f"{stats['processing_seconds']:.1f} detik: {stats['effective_fps']:.1f} frame/detik efektif")
+    print(f"{stats['inferred']} frame dinilai ({stats['inferred_fraction'] * 100:.1f}%), "
+          f"{stats['skipped_duplicate']} dilewati karena hampir sama, {stats['skipped_rate']} karena batas fps, "
+          f"rata-rata batch {stats['mean_batch_size']:.1f}")
+    print(f"Label akhir: {stats['label']}, label dominan: {stats['dominant_label']}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(stats, f, indent=2)
@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+import numpy as np
+
+from sibetta import load_and_preprocess_image, model_files, output
+from sibetta_bulk import list_images
+
+
+# Interpreter TFLite: pakai ai_edge_litert / tflite_runtime jika terpasang,
+# jika tidak gunakan tf.lite bawaan TensorFlow
+def _interpreter_class():
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+# Pembungkus interpreter TFLite dengan antarmuka yang sama seperti model Keras
+# (predict / predict_on_batch), sehingga bisa dipakai langsung oleh predict_image_class
+class TFLiteModel:
+    def __init__(self, model_path, num_threads=None):
+        self.model_path = model_path
+        self.interpreter = _interpreter_class()(model_path=model_path, num_threads=num_threads)
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.batch_size = None
+        # Interpreter tidak thread-safe, sedangkan Streamlit memakai satu model untuk semua sesi
+        self._lock = threading.Lock()
+
+    def predict_on_batch(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        with self._lock:
+            if len(x) != self.batch_size:
+                self.interpreter.resize_tensor_input(self.input_index, list(x.shape))
+                self.interpreter.allocate_tensors()
+                self.batch_size = len(x)
+            self.interpreter.set_tensor(self.input_index, x)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output_index).copy()
+
+    def predict(self, x, batch_size=32, **kwargs):
+        return np.concatenate([self.predict_on_batch(x[i:i + batch_size]) for i in range(0, len(x), batch_size)])
+
+
+def _load(path):
+    return load_and_preprocess_image(path)
+
+# Gambar kalibrasi INT8: diambil acak dari train/ dengan seed tetap agar hasil konversi bisa diulang
+def representative_dataset(train_dir, num_samples=100, seed=0):
+    items = list_images(train_dir)
+    random.Random(seed).shuffle(items)
+    def generator():
+        for path, _ in items[:num_samples]:
+            yield [_load(path)]
+    return generator
+
+
+def convert(keras_model, quantization, train_dir=None, num_samples=100):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'fp16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'int8':
+        if not train_dir:
+            raise ValueError('INT8 quantization needs calibration images (train_dir)')
+        converter.representative_dataset = representative_dataset(train_dir, num_samples)
+    else:
+        raise ValueError(f'unknown quantization: {quantization}')
+    return converter.convert()
+
+
+# Bandingkan backend TFLite dengan model Keras di folder test/:
+# kesepakatan top-1 dengan Keras, akurasi, selisih akurasi, dan latensi per gambar
+def parity_report(models, test_dir, batch_size=32):
+    from sibetta_shards import iter_labeled_batches
+
+    labels = []
+    predictions = {name: [] for name in models}
+    seconds = {name: 0.0 for name in models}
+
+    for inputs, batch_labels in iter_labeled_batches(test_dir, batch_size):
+        labels.append(batch_labels)
+        for name, model in models.items():
+            begin = time.perf_counter()
+            prediction = np.asarray(model.predict_on_batch(inputs))
+            seconds[name] += time.perf_counter() - begin
+            predictions[name].append(np.argmax(prediction, axis=1))
+
+    labels = np.concatenate(labels)
+    predictions = {name: np.concatenate(p) for name, p in predictions.items()}
+    reference = predictions['keras']
+    reference_accuracy = float(np.mean(reference == labels))
+    report = {'test_dir': test_dir, 'images': len(labels), 'backends': {}}
+    for name, predicted in predictions.items():
+        accuracy = float(np.mean(predicted == labels))
+        report['backends'][name] = {
+            'model_file': model_files[name],
+            'model_size_mb': round(os.path.getsize(model_files[name]) / 2**20, 2),
+            'accuracy': accuracy,
+            'accuracy_delta': accuracy - reference_accuracy,
+            'top1_agreement': float(np.mean(predicted == reference)),
+            'ms_per_image': 1000.0 * seconds[name] / len(labels),
+        }
+    return report
+
+
+def run_convert(args):
+    from tensorflow.keras.models import load_model
+
+    keras_model = load_model(output)
+    for quantization in args.quantization:
+        start = time.perf_counter()
+        data = convert(keras_model, quantization, args.train_dir, args.num_calibration)
+        path = model_files[f'tflite-{quantization}']
+        with open(path, 'wb') as f:
+            f.write(data)
+        print(f'{path}: {len(data) / 2**20:.1f} MB ({time.perf_counter() - start:.1f} detik)')
+
+
+def run_parity(args):
+    from tensorflow.keras.models import load_model
+
+    models = {'keras': load_model(output)}
+    for name in ('tflite-fp16', 'tflite-int8'):
+        if os.path.exists(model_files[name]):
+            models[name] = TFLiteModel(model_files[name], num_threads=args.num_threads)
+    report = parity_report(models, args.test_dir, args.batch_size)
+
+    for name, row in report['backends'].items():
+        print(f"{name:12s} akurasi={row['accuracy']:.4f} (delta {row['accuracy_delta']:+.4f}) "
+              f"top1_agreement={row['top1_agreement']:.4f} {row['ms_per_image']:.1f} ms/gambar "
+              f"{row['model_size_mb']:.1f} MB")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Konversi model SiBetta ke TFLite dan uji paritasnya')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help='buat model TFLite float16 dan/atau INT8')
+    convert_parser.add_argument('--quantization', nargs='+', choices=['fp16', 'int8'], default=['fp16', 'int8'])
+    convert_parser.add_argument('--train-dir', default='train', help='folder gambar kalibrasi INT8')
+    convert_parser.add_argument('--num-calibration', type=int, default=100)
+    convert_parser.set_defaults(func=run_convert)
+
+    parity_parser = subparsers.add_parser('parity', help='bandingkan backend TFLite dengan model Keras')
+    parity_parser.add_argument('--test-dir', default='test')
+    parity_parser.add_argument('--batch-size', type=int, default=32)
+    parity_parser.add_argument('--num-threads', type=int, default=None)
+    parity_parser.add_argument('--output', help='simpan laporan sebagai JSON')
+    parity_parser.set_defaults(func=run_parity)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    args.func(args)
@@ -0,0 +1,240 @@
+import argparse
+import json
+import math
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.applications import VGG16
+from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
+from tensorflow.keras.layers import Dense, Dropout, Flatten, Input
+from tensorflow.keras.models import Sequential, load_model
+from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.preprocessing.image import ImageDataGenerator, img_to_array, load_img
+
+from sibetta import class_indices
+from sibetta_data import AUGMENTATION, TARGET_SIZE, list_images, make_dataset
+
+
+FEATURE_SHAPE = (7, 7, 512)
+
+
+# Base VGG16 yang dibekukan: bobot ImageNet, atau diambil dari model .h5 yang sudah ada
+def load_base_model(source='imagenet'):
+    if source == 'imagenet':
+        base_model = VGG16(weights='imagenet', include_top=False, input_shape=TARGET_SIZE + (3,))
+    else:
+        base_model = load_model(source).layers[0]
+    for layer in base_model.layers:
+        layer.trainable = False
+    base_model.trainable = False
+    return base_model
+
+# Head klasifikasi yang sama dengan model di notebook pelatihan
+def build_head(dense_units=512, dropout=0.5):
+    return Sequential([
+        Input(shape=FEATURE_SHAPE),
+        Flatten(),
+        Dense(dense_units, activation='relu'),
+        Dropout(dropout),
+        Dense(len(class_indices), activation='softmax'),
+    ])
+
+# Gabungkan base dan head menjadi model utuh yang bisa dimuat oleh sibetta.py
+def assemble_model(base_model, head):
+    model = Sequential([base_model] + head.layers)
+    model.build((None,) + TARGET_SIZE + (3,))
+    return model
+
+
+# Hitung fitur VGG16 sekali untuk setiap gambar (ditambah `augment` varian acak)
+# dan simpan ke feature store yang bisa di-memory-map
+def extract_features(base_model, image_dir, store_dir, augment=0, batch_size=32, seed=0):
+    items = list_images(image_dir)
+    total = len(items) * (augment + 1)
+    os.makedirs(store_dir, exist_ok=True)
+    features = np.lib.format.open_memmap(
+        os.path.join(store_dir, 'features.npy'), mode='w+', dtype=np.float16, shape=(total,) + FEATURE_SHAPE)
+    labels = np.empty(total, dtype=np.int64)
+
+    datagen = ImageDataGenerator(**AUGMENTATION)
+    rng = np.random.default_rng(seed)
+
+    def variants():
+        for path, label in items:
+            x = img_to_array(load_img(path, target_size=TARGET_SIZE))
+            yield x, label
+            for _ in range(augment):
+                yield datagen.random_transform(x, seed=int(rng.integers(2**31))), label
+
+    start = time.perf_counter()
+    batch, position = [], 0
+    for x, label in variants():
+        batch.append(x)
+        labels[position + len(batch) - 1] = label
+        if len(batch) == batch_size:
+            features[position:position + len(batch)] = base_model.predict_on_batch(np.stack(batch) / 255.0)
+            position += len(batch)
+            batch = []
+    if batch:
+        features[position:position + len(batch)] = base_model.predict_on_batch(np.stack(batch) / 255.0)
+    features.flush()
+    del features
+
+    np.save(os.path.join(store_dir, 'labels.npy'), labels)
+    with open(os.path.join(store_dir, 'meta.json'), 'w') as f:
+        json.dump({
+            'image_dir': image_dir,
+            'images': len(items),
+            'augment': augment,
+            'samples': total,
+            'feature_shape': FEATURE_SHAPE,
+            'class_indices': class_indices,
+        }, f, indent=2)
+    print(f'{store_dir}: {total} fitur dari {len(items)} gambar ({time.perf_counter() - start:.1f} detik)')
+
+
+def open_feature_store(store_dir):
+    features = np.load(os.path.join(store_dir, 'features.npy'), mmap_mode='r')
+    labels = np.load(os.path.join(store_dir, 'labels.npy'))
+    return features, labels
+
+
+# Batch fitur dibaca langsung dari memmap, jadi store tidak perlu muat seluruhnya di RAM
+class FeatureSequence(tf.keras.utils.PyDataset):
+    def __init__(self, store_dir, batch_size=32, shuffle=False, seed=0, **kwargs):
+        super().__init__(**kwargs)
+        self.features, self.labels = open_feature_store(store_dir)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(seed)
+        self.order = np.arange(len(self.labels))
+        self.on_epoch_end()
+
+    def __len__(self):
+        return math.ceil(len(self.labels) / self.batch_size)
+
+    def __getitem__(self, index):
+        # Indeks diurutkan agar pembacaan memmap tetap berurutan
+        batch = np.sort(self.order[index * self.batch_size:(index + 1) * self.batch_size])
+        x = self.features[batch].astype(np.float32)
+        y = tf.keras.utils.to_categorical(self.labels[batch], len(class_indices))
+        return x, y
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self.rng.shuffle(self.order)
+
+
+def train_head(train_store, test_store, epochs=100, batch_size=32, learning_rate=0.0001,
+               dense_units=512, dropout=0.5, patience=None, checkpoint='best_head.h5'):
+    head = build_head(dense_units, dropout)
+    head.compile(optimizer=Adam(learning_rate=learning_rate), loss='categorical_crossentropy', metrics=['accuracy'])
+
+    callbacks = [ModelCheckpoint(checkpoint, monitor='val_loss', save_best_only=True)]
+    if patience:
+        callbacks.append(EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True))
+
+    history = head.fit(
+        FeatureSequence(train_store, batch_size, shuffle=True),
+        validation_data=FeatureSequence(test_store, batch_size),
+        epochs=epochs,
+        callbacks=callbacks,
+    )
+    head.load_weights(checkpoint)
+    return head, history
+
+
+# Pelatihan end-to-end seperti di notebook, dengan input dari pipeline tf.data
+def train_full(base_model, train_dir, test_dir, epochs=100, batch_size=32, learning_rate=0.0001,
+               cache=None, checkpoint='best_model.h5'):
+    model = assemble_model(base_model, build_head())
+    model.compile(optimizer=Adam(learning_rate=learning_rate), loss='categorical_crossentropy', metrics=['accuracy'])
+
+    history = model.fit(
+        make_dataset(train_dir, batch_size, augment=True, cache=cache),
+        validation_data=make_dataset(test_dir, batch_size, shuffle=False, cache=cache),
+        epochs=epochs,
+        callbacks=[ModelCheckpoint(checkpoint, monitor='val_loss', save_best_only=True)],
+    )
+    return model, history
+
+
+def run_extract(args):
+    base_model = load_base_model(args.base)
+    extract_features(base_model, args.train_dir, os.path.join(args.store, 'train'), args.augment, args.batch_size)
+    extract_features(base_model, args.test_dir, os.path.join(args.store, 'test'), 0, args.batch_size)
+
+
+def run_head(args):
+    start = time.perf_counter()
+    head, history = train_head(
+        os.path.join(args.store, 'train'), os.path.join(args.store, 'test'),
+        args.epochs, args.batch_size, args.learning_rate, args.dense_units, args.dropout, args.patience,
+        os.path.join(args.store, 'best_head.h5'))
+    best = int(np.argmin(history.history['val_loss']))
+    print(f"Head dilatih dalam {time.perf_counter() - start:.1f} detik, "
+          f"val_accuracy terbaik {history.history['val_accuracy'][best]:.4f} (epoch {best + 1})")
+
+    if args.output:
+        model = assemble_model(load_base_model(args.base), head)
+        model.save(args.output)
+        print(f'Model lengkap disimpan ke {args.output}')
+
+
+def run_fit(args):
+    start = time.perf_counter()
+    cache = None if args.no_cache else ''
+    _, history = train_full(load_base_model(args.base), args.train_dir, args.test_dir, args.epochs,
+                            args.batch_size, args.learning_rate, cache, args.output)
+    best = int(np.argmin(history.history['val_loss']))
+    print(f"Model dilatih dalam {time.perf_counter() - start:.1f} detik, "
+          f"val_accuracy terbaik {history.history['val_accuracy'][best]:.4f} (epoch {best + 1}), "
+          f"disimpan ke {args.output}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Pelatihan model SiBetta di luar notebook')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    extract_parser = subparsers.add_parser('extract', help='hitung fitur VGG16 untuk train/ dan test/ sekali saja')
+    extract_parser.add_argument('--train-dir', default='train')
+    extract_parser.add_argument('--test-dir', default='test')
+    extract_parser.add_argument('--store', default='features', help='folder feature store')
+    extract_parser.add_argument('--augment', type=int, default=0,
+                                help='jumlah varian augmentasi per gambar train')
+    extract_parser.add_argument('--base', default='imagenet',
+                                help="bobot VGG16: 'imagenet' atau path model .h5 yang base-nya dipakai ulang")
+    extract_parser.add_argument('--batch-size', type=int, default=32)
+    extract_parser.set_defaults(func=run_extract)
+
+    head_parser = subparsers.add_parser('head', help='latih head klasifikasi dari feature store')
+    head_parser.add_argument('--store', default='features')
+    head_parser.add_argument('--epochs', type=int, default=100)
+    head_parser.add_argument('--batch-size', type=int, default=32)
+    head_parser.add_argument('--learning-rate', type=float, default=0.0001)
+    head_parser.add_argument('--dense-units', type=int, default=512)
+    head_parser.add_argument('--dropout', type=float, default=0.5)
+    head_parser.add_argument('--patience', type=int, default=None, help='early stopping pada val_loss')
+    head_parser.add_argument('--base', default='imagenet', help='base yang sama dengan saat extract')
+    head_parser.add_argument('--output', default='best_model.h5',
+                             help='simpan model lengkap (base + head) untuk dipakai sibetta.py')
+    head_parser.set_defaults(func=run_head)
+
+    fit_parser = subparsers.add_parser('fit', help='latih model lengkap dengan pipeline tf.data')
+    fit_parser.add_argument('--train-dir', default='train')
+    fit_parser.add_argument('--test-dir', default='test')
+    fit_parser.add_argument('--epochs', type=int, default=100)
+    fit_parser.add_argument('--batch-size', type=int, default=32)
+    fit_parser.add_argument('--learning-rate', type=float, default=0.0001)
+    fit_parser.add_argument('--no-cache', action='store_true', help='jangan cache gambar yang sudah di-decode')
+    fit_parser.add_argument('--base', default='imagenet')
+    fit_parser.add_argument('--output', default='best_model.h5')
+    fit_parser.set_defaults(func=run_fit)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    args.func(args)
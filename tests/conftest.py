@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul sibetta_*.py ada di root repository, bukan di dalam paket
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
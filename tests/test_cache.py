@@ -0,0 +1,44 @@
+from sibetta_cache import PredictionCache, hash_bytes
+
+
+MODEL_HASH = hash_bytes(b'model')
+
+
+def test_lru_evicts_least_recently_used():
+    cache = PredictionCache(MODEL_HASH, max_entries=2)
+    cache.put('a', 'plakat', 0.9)
+    cache.put('b', 'halfmoon', 0.8)
+    assert cache.get('a') == ('plakat', 0.9)
+    cache.put('c', 'crowntail', 0.7)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == ('plakat', 0.9)
+    assert cache.get('c') == ('crowntail', 0.7)
+    assert cache.stats() == {'hits': 3, 'misses': 1, 'entries': 2}
+
+
+def test_disk_tier_survives_eviction_and_restart(tmp_path):
+    cache = PredictionCache(MODEL_HASH, max_entries=1, cache_dir=str(tmp_path))
+    cache.put('a', 'plakat', 0.9)
+    cache.put('b', 'halfmoon', 0.8)
+    # 'a' sudah keluar dari LRU memori, tetapi masih dibaca dari disk
+    assert cache.get('a') == ('plakat', 0.9)
+
+    restarted = PredictionCache(MODEL_HASH, max_entries=1, cache_dir=str(tmp_path))
+    assert restarted.get('b') == ('halfmoon', 0.8)
+    assert restarted.get('missing') is None
+    assert restarted.stats() == {'hits': 1, 'misses': 1, 'entries': 1}
+
+
+def test_disk_tier_is_keyed_by_model(tmp_path):
+    PredictionCache(MODEL_HASH, cache_dir=str(tmp_path)).put('a', 'plakat', 0.9)
+    other_model = PredictionCache(hash_bytes(b'other model'), cache_dir=str(tmp_path))
+    assert other_model.get('a') is None
+
+
+def test_similarity_lru():
+    cache = PredictionCache(MODEL_HASH, max_entries=1)
+    cache.put_similarity('a', [1.0], ('train/plakat/1.jpg', 0.99))
+    cache.put_similarity('b', [2.0], None)
+    assert cache.get_similarity('a') is None
+    assert cache.get_similarity('b') == ([2.0], None)
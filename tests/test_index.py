@@ -0,0 +1,129 @@
+import threading
+
+import numpy as np
+
+from sibetta_index import NPROBE, EmbeddingIndex, normalize
+
+
+DIM = 16
+
+
+# Embedding berkelompok seperti fitur gambar asli (lihat sibetta_bench.bench_index)
+def clustered_embeddings(rng, centers, n):
+    return centers[rng.integers(len(centers), size=n)] + rng.random((n, centers.shape[1]), dtype=np.float32) ** 4
+
+def make_centers(rng, clusters=100, dim=DIM):
+    return rng.random((clusters, dim), dtype=np.float32) ** 4
+
+
+def top_paths(results):
+    return [[path for path, _ in row] for row in results]
+
+
+def test_add_remove_compact_keeps_id_mapping(tmp_path):
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((4, DIM)).astype(np.float32)
+    index = EmbeddingIndex(str(tmp_path), DIM)
+    assert index.add(['a', 'b', 'c', 'd'], embeddings) == [0, 1, 2, 3]
+
+    assert index.remove(['b', 'missing']) == 1
+    assert 'b' not in index and len(index) == 3
+    assert 'b' not in top_paths(index.search(embeddings, k=4))[0]
+
+    index.compact()
+    assert index.paths == ['a', 'c', 'd']
+    assert index.ids == {'a': 0, 'c': 1, 'd': 2}
+    for path, embedding in zip(['a', 'c', 'd'], embeddings[[0, 2, 3]]):
+        assert index.search(embedding, k=1)[0][0][0] == path
+
+    reopened = EmbeddingIndex(str(tmp_path))
+    assert reopened.ids == index.ids
+    np.testing.assert_allclose(reopened.matrix[:3], normalize(embeddings[[0, 2, 3]]), atol=1e-3)
+
+
+def test_add_replaces_existing_path(tmp_path):
+    index = EmbeddingIndex(str(tmp_path), DIM)
+    index.add(['a', 'b'], np.eye(DIM, dtype=np.float32)[:2])
+    index.add(['a'], np.eye(DIM, dtype=np.float32)[2:3])
+    assert index.ids == {'b': 1, 'a': 2}
+    assert index.search(np.eye(DIM, dtype=np.float32)[2], k=1)[0][0] == ('a', 1.0)
+
+
+def test_trim_drops_oldest(tmp_path):
+    index = EmbeddingIndex(str(tmp_path), DIM)
+    index.add([f'{i}.jpg' for i in range(5)], np.random.default_rng(0).random((5, DIM)))
+    index.trim(2)
+    assert sorted(index.ids) == ['3.jpg', '4.jpg']
+
+
+def test_partitioned_search_matches_exact(tmp_path):
+    rng = np.random.default_rng(0)
+    centers = make_centers(rng, dim=128)
+    embeddings = clustered_embeddings(rng, centers, 5000)
+    queries = clustered_embeddings(rng, centers, 50)
+    index = EmbeddingIndex(str(tmp_path), 128)
+    index.add([f'{i}.jpg' for i in range(len(embeddings))], embeddings)
+    exact = top_paths(index.search(queries, k=5))
+
+    index.train_partition()
+    assert index.partitioned
+    # Semua partisi diperiksa: hasilnya sama persis dengan pencarian menyeluruh
+    assert top_paths(index.search(queries, k=5, nprobe=len(index.centroids))) == exact
+
+    approximate = top_paths(index.search(queries, k=5, nprobe=NPROBE))
+    recall = np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approximate, exact)])
+    assert recall >= 0.95
+
+
+def test_partition_follows_add_remove_and_reopen(tmp_path):
+    rng = np.random.default_rng(1)
+    centers = make_centers(rng)
+    index = EmbeddingIndex(str(tmp_path), DIM)
+    index.add([f'{i}.jpg' for i in range(500)], clustered_embeddings(rng, centers, 500))
+    index.train_partition(nlist=8)
+
+    new = clustered_embeddings(rng, centers, 1)
+    index.add(['new.jpg'], new)
+    index.remove(['0.jpg'])
+    assert len(index.assignments) == len(index.paths)
+    assert index.search(new, k=1, nprobe=8)[0][0][0] == 'new.jpg'
+    assert '0.jpg' not in top_paths(index.search(index.matrix[0], k=500, nprobe=8))[0]
+
+    reopened = EmbeddingIndex(str(tmp_path))
+    assert reopened.partitioned
+    np.testing.assert_array_equal(reopened.assignments, index.assignments)
+
+
+# Beberapa sesi Streamlit memakai satu indeks unggahan bersama: add, search, dan trim dari 8 thread
+# tidak boleh gagal dan setiap path harus tetap menunjuk ke embedding-nya sendiri
+def test_concurrent_add_search_trim(tmp_path):
+    index = EmbeddingIndex(str(tmp_path), DIM)
+    vectors = {}
+    errors = []
+
+    def worker(thread_id):
+        rng = np.random.default_rng(thread_id)
+        try:
+            for step in range(40):
+                paths = [f'{thread_id}-{step}-{i}' for i in range(3)]
+                embeddings = rng.standard_normal((3, DIM)).astype(np.float32)
+                vectors.update(zip(paths, normalize(embeddings)))
+                index.add(paths, embeddings)
+                index.search(embeddings, k=3)
+                index.trim(200)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(index) == 200
+    for path, i in index.ids.items():
+        assert index.paths[i] == path
+        np.testing.assert_allclose(index.matrix[i], vectors[path], atol=1e-3)
+    reopened = EmbeddingIndex(str(tmp_path))
+    assert reopened.ids == index.ids
@@ -0,0 +1,37 @@
+import pytest
+
+import sibetta_metrics as metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram('latency_seconds', 'Latency.', buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, stage='decode')
+
+    assert histogram.render() == [
+        '# HELP latency_seconds Latency.',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{stage="decode",le="0.1"} 2',
+        'latency_seconds_bucket{stage="decode",le="1.0"} 3',
+        'latency_seconds_bucket{stage="decode",le="+Inf"} 4',
+        'latency_seconds_sum{stage="decode"} 2.65',
+        'latency_seconds_count{stage="decode"} 4',
+    ]
+
+
+def test_counter_escapes_label_values():
+    counter = metrics.Counter('errors_total', 'Errors.')
+    counter.inc(stage='decode', type='Bad "image"')
+    counter.inc(2, stage='decode', type='Bad "image"')
+    assert counter.render()[-1] == 'errors_total{stage="decode",type="Bad \\"image\\""} 3'
+
+
+def test_timed_counts_an_error_once(monkeypatch):
+    errors = metrics.Counter('errors_total', 'Errors.')
+    monkeypatch.setattr(metrics, 'errors', errors)
+    with pytest.raises(ValueError) as info:
+        with metrics.timed('upload'):
+            with metrics.timed('decode'):
+                raise ValueError('rusak')
+    metrics.count_error('request', info.value)
+    assert errors.render()[2:] == ['errors_total{stage="decode",type="ValueError"} 1']
@@ -0,0 +1,46 @@
+import asyncio
+
+import numpy as np
+
+from sibetta_server import MicroBatcher
+
+
+class RecordingModel:
+    def __init__(self, fail=False):
+        self.batch_sizes = []
+        self.fail = fail
+
+    def predict_on_batch(self, inputs):
+        self.batch_sizes.append(len(inputs))
+        if self.fail:
+            raise RuntimeError('model error')
+        return inputs * 2
+
+
+async def predict_all(batcher, count):
+    runner = asyncio.create_task(batcher.run())
+    try:
+        return await asyncio.gather(
+            *(batcher.predict(np.array([[i, 1.0]], dtype=np.float32)) for i in range(count)),
+            return_exceptions=True)
+    finally:
+        runner.cancel()
+
+
+def test_requests_are_batched_and_answered_in_order():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=50)
+    results = asyncio.run(predict_all(batcher, 6))
+
+    assert model.batch_sizes == [4, 2]
+    assert (batcher.batches, batcher.images) == (2, 6)
+    for i, result in enumerate(results):
+        np.testing.assert_array_equal(result, [2.0 * i, 2.0])
+
+
+def test_model_error_fails_every_request_in_the_batch():
+    batcher = MicroBatcher(RecordingModel(fail=True), max_batch_size=4, max_wait_ms=50)
+    results = asyncio.run(predict_all(batcher, 3))
+
+    assert [type(result) for result in results] == [RuntimeError] * 3
+    assert (batcher.batches, batcher.images) == (0, 0)
@@ -0,0 +1,52 @@
+import numpy as np
+from PIL import Image
+
+from sibetta_stream import StreamClassifier, dhash, hamming
+
+
+CLASS_INDICES = {'gelap': 0, 'terang': 1}
+
+
+class IdentityModel:
+    def predict_on_batch(self, inputs):
+        return inputs
+
+
+def gradient(reverse=False):
+    row = np.linspace(0, 255, 64, dtype=np.uint8)
+    pixels = np.tile(row[::-1] if reverse else row, (64, 1))
+    return Image.fromarray(np.stack([pixels] * 3, axis=-1))
+
+
+# "Probabilitas" dari piksel kiri atas, jadi hasil tiap frame bisa ditebak
+def preprocess(frames):
+    return np.array([[1.0, 0.0] if np.asarray(frame)[0, 0, 0] < 128 else [0.0, 1.0] for frame in frames])
+
+
+def test_dhash_separates_different_frames():
+    assert hamming(dhash(gradient()), dhash(gradient())) == 0
+    assert hamming(dhash(gradient()), dhash(gradient(reverse=True))) == 64
+
+
+def test_duplicate_and_rate_skips():
+    stream = StreamClassifier(IdentityModel(), preprocess, CLASS_INDICES, batch_size=2,
+                              max_inferred_fps=5.0, max_delay=10.0, smoothing=0.3)
+    dark, light = gradient(), gradient(reverse=True)
+    for timestamp, frame in [(0.0, dark), (0.1, dark), (0.15, light), (0.3, light), (0.4, light)]:
+        stream.feed(frame, timestamp)
+    stream.flush()
+
+    stats = stream.stats()
+    assert (stats['frames'], stats['inferred'], stats['batches']) == (5, 2, 1)
+    assert stats['skipped_duplicate'] == 2
+    assert stats['skipped_rate'] == 1
+    # EMA: 0.3 * [0, 1] + 0.7 * [1, 0]
+    assert stats['label'] == 'gelap'
+    assert np.isclose(stats['confidence'], 0.7)
+
+
+def test_flush_scores_pending_frames():
+    stream = StreamClassifier(IdentityModel(), preprocess, CLASS_INDICES, batch_size=8, max_delay=10.0)
+    assert stream.feed(gradient(reverse=True), 0.0) == (None, None)
+    assert stream.flush() == ('terang', 1.0)
+    assert stream.stats()['batches'] == 1